@@ -5,28 +5,88 @@ Creates a graph following the H-Test-002 workflow with multiple action types.
 
 from __future__ import annotations
 
+import base64
 import json
 from typing import Union, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 import asyncio
+import functools
 import logging
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
-from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 from cuteagent import WindowsAgent
 
+try:
+    # orjson decodes JSON several times faster than the stdlib; optional
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+log = logging.getLogger(__name__)
+
+class LazyDataURI:
+    """Defer base64-encoding screenshot bytes until the URI is actually read.
+
+    Encoding a full-screen PNG is megabytes of bytes->str work; graph paths
+    that never look at screenshot_url should not pay for it. str() encodes
+    on first use and reuses the result after that.
+    """
+    __slots__ = ("_raw", "_uri")
+
+    def __init__(self, raw: bytes):
+        self._raw = raw
+        self._uri = None
+
+    def __str__(self) -> str:
+        if self._uri is None:
+            self._uri = "data:image/png;base64," + base64.b64encode(self._raw).decode("ascii")
+        return self._uri
+
 class State(BaseModel):
     """Input state for the agent."""
+    # Nearly every node writes status/current_node back to state; keep those
+    # writes plain attribute stores (no per-assignment validation) and drop
+    # unknown keys instead of erroring on them
+    model_config = ConfigDict(
+        validate_assignment=False, extra="ignore", arbitrary_types_allowed=True
+    )
+
     user_input: Union[str, Dict[str, Any], None] = None
     current_node: int = 0
     status: str = "Ongoing"
     borrower_name: str = "Graves, Sonnyy"  # Default borrower name
-    screenshot_url: Union[str, None] = None
+    screenshot_url: Union[str, LazyDataURI, None] = None
 
 # Hardcoded OS URL
 OS_URL = "https://fintor-ec2-united.ngrok.app"
 
-async def extract_borrower_name(state: State, config: RunnableConfig) -> State:
+# All WindowsAgent calls run on one dedicated, named thread: the remote OS
+# accepts a single action at a time anyway, and a pinned worker avoids the
+# per-call contextvars copy and default-executor contention of
+# asyncio.to_thread
+_WA_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wa")
+
+def _run_on_wa(fn, *args):
+    """Schedule one WindowsAgent call on the dedicated agent thread."""
+    return asyncio.get_running_loop().run_in_executor(
+        _WA_EXECUTOR, functools.partial(fn, *args)
+    )
+
+@functools.lru_cache(maxsize=1)
+def get_agent() -> WindowsAgent:
+    """One WindowsAgent shared by every action.
+
+    Constructing the client per call threw away its connection state each
+    time; a single instance keeps the underlying HTTP session to OS_URL
+    alive across all ~30 steps. Only the pinned wa thread ever calls into
+    it, so the sync client needs no locking.
+    """
+    return WindowsAgent(os_url=OS_URL)
+
+async def extract_borrower_name(state: State) -> State:
     """Extract borrower name from user_input (string JSON or dict format)."""
     try:
         if state.user_input:
@@ -36,34 +96,35 @@ async def extract_borrower_name(state: State, config: RunnableConfig) -> State:
             if isinstance(state.user_input, dict):
                 if "borrower" in state.user_input:
                     borrower = state.user_input["borrower"]
-                    logging.info(f"Extracted borrower name from dict input: '{borrower}'")
+                    log.info("Extracted borrower name from dict input: '%s'", borrower)
                 else:
-                    logging.warning(f"No 'borrower' field found in dict input: {state.user_input}")
+                    log.warning("No 'borrower' field found in dict input: %s", state.user_input)
             
             # Handle if user_input is a string (JSON)
             elif isinstance(state.user_input, str):
                 try:
-                    user_data = json.loads(state.user_input)
+                    user_data = _json_loads(state.user_input)
                     if isinstance(user_data, dict) and "borrower" in user_data:
                         borrower = user_data["borrower"]
-                        logging.info(f"Extracted borrower name from JSON string: '{borrower}'")
+                        log.info("Extracted borrower name from JSON string: '%s'", borrower)
                     else:
-                        logging.warning(f"No 'borrower' field found in JSON: {user_data}")
-                except json.JSONDecodeError:
-                    logging.warning(f"Could not parse user_input as JSON: {state.user_input}")
+                        log.warning("No 'borrower' field found in JSON: %s", user_data)
+                # ValueError covers both json.JSONDecodeError and orjson's
+                except ValueError:
+                    log.warning("Could not parse user_input as JSON: %s", state.user_input)
             
             # Update borrower_name if found
             if borrower:
                 state.borrower_name = borrower
         else:
-            logging.info("No user_input provided, using default borrower name")
+            log.info("No user_input provided, using default borrower name")
         
-        logging.info(f"Using borrower name: '{state.borrower_name}'")
+        log.info("Using borrower name: '%s'", state.borrower_name)
         state.current_node = 0
         state.status = "Initialized"
         
     except Exception as e:
-        logging.error(f"Error extracting borrower name: {e}")
+        log.warning("Error extracting borrower name: %r", e)
         # Keep default borrower name on error
         state.status = "Warning"
     
@@ -71,27 +132,45 @@ async def extract_borrower_name(state: State, config: RunnableConfig) -> State:
 
 async def click_action(x: int, y: int, description: str, node_number: int, state: State) -> State:
     """Generic click action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
-        await asyncio.to_thread(agent.click_element, x, y)
-        logging.info(f"Node {node_number}: Successfully clicked at ({x}, {y}) - {description}")
+        await _run_on_wa(agent.click_element, x, y)
+        log.info("Node %d: Successfully clicked at (%d, %d) - %s", node_number, x, y, description)
         status = "Success"
     except Exception as e:
-        logging.error(f"Node {node_number}: Error clicking at ({x}, {y}) - {description}: {e}")
+        log.error("Node %d: Error clicking at (%d, %d) - %s: %s", node_number, x, y, description, e)
         status = "Error"
     
     state.current_node = node_number
     state.status = status
     return state
 
+def _warm_connection() -> None:
+    """Best-effort keep-alive request to the OS endpoint.
+
+    The ngrok tunnel and its TLS session go cold during long waits; a cheap
+    HEAD here means the click after the wait doesn't pay connection setup.
+    """
+    try:
+        urllib.request.urlopen(
+            urllib.request.Request(OS_URL, method="HEAD"), timeout=3
+        ).close()
+    except Exception:
+        pass
+
 async def wait_action(duration: int, description: str, node_number: int, state: State) -> State:
     """Generic wait action function."""
     try:
+        # Long waits are dead time; overlap them with a connection warm-up so
+        # the next action starts on a live tunnel
+        warm = _run_on_wa(_warm_connection) if duration >= 5 else None
         await asyncio.sleep(duration)
-        logging.info(f"Node {node_number}: Successfully waited {duration} seconds - {description}")
+        if warm is not None:
+            await warm
+        log.info("Node %d: Successfully waited %d seconds - %s", node_number, duration, description)
         status = "Success"
     except Exception as e:
-        logging.error(f"Node {node_number}: Error during wait - {description}: {e}")
+        log.error("Node %d: Error during wait - %s: %s", node_number, description, e)
         status = "Error"
     
     state.current_node = node_number
@@ -100,7 +179,7 @@ async def wait_action(duration: int, description: str, node_number: int, state:
 
 async def input_action(text: str, description: str, node_number: int, state: State) -> State:
     """Generic input action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         # For INPUT action, use the correct format from the example
         input_type = {
@@ -109,11 +188,11 @@ async def input_action(text: str, description: str, node_number: int, state: Sta
             "value": text, 
             "model_selected": "claude"
         }
-        await asyncio.to_thread(agent.act, input_type)
-        logging.info(f"Node {node_number}: Successfully input text '{text}' - {description}")
+        await _run_on_wa(agent.act, input_type)
+        log.info("Node %d: Successfully input text '%s' - %s", node_number, text, description)
         status = "Success"
     except Exception as e:
-        logging.error(f"Node {node_number}: Error inputting text - {description}: {e}")
+        log.error("Node %d: Error inputting text - %s: %s", node_number, description, e)
         status = "Error"
     
     state.current_node = node_number
@@ -122,7 +201,7 @@ async def input_action(text: str, description: str, node_number: int, state: Sta
 
 async def enter_action(description: str, node_number: int, state: State) -> State:
     """Generic enter key action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         # For ENTER action, we'll use the act method with ENTER action
         input_data = {
@@ -131,11 +210,11 @@ async def enter_action(description: str, node_number: int, state: State) -> Stat
             "value": "",
             "model_selected": "claude"
         }
-        await asyncio.to_thread(agent.act, input_data)
-        logging.info(f"Node {node_number}: Successfully pressed ENTER - {description}")
+        await _run_on_wa(agent.act, input_data)
+        log.info("Node %d: Successfully pressed ENTER - %s", node_number, description)
         status = "Success"
     except Exception as e:
-        logging.error(f"Node {node_number}: Error pressing ENTER - {description}: {e}")
+        log.error("Node %d: Error pressing ENTER - %s: %s", node_number, description, e)
         status = "Error"
     
     state.current_node = node_number
@@ -144,7 +223,7 @@ async def enter_action(description: str, node_number: int, state: State) -> Stat
 
 async def double_click_action(x: int, y: int, description: str, node_number: int, state: State) -> State:
     """Generic double-click action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         # Use the correct DOUBLE-CLICK action format
         input_type = {
@@ -153,285 +232,313 @@ async def double_click_action(x: int, y: int, description: str, node_number: int
             "value": "value", 
             "model_selected": "claude"
         }
-        await asyncio.to_thread(agent.act, input_type)
-        logging.info(f"Node {node_number}: Successfully double-clicked at ({x}, {y}) - {description}")
+        await _run_on_wa(agent.act, input_type)
+        log.info("Node %d: Successfully double-clicked at (%d, %d) - %s", node_number, x, y, description)
         status = "Success"
     except Exception as e:
-        logging.error(f"Node {node_number}: Error double-clicking at ({x}, {y}) - {description}: {e}")
+        log.error("Node %d: Error double-clicking at (%d, %d) - %s: %s", node_number, x, y, description, e)
         status = "Error"
     
     state.current_node = node_number
     state.status = status
     return state
 
-# H-Test-002 Workflow Nodes (based on the JSON instructions)
-
-async def node_01_click_pipeline(state: State, config: RunnableConfig) -> State:
-    """Order 1: CLICK - Coordinates for Pipeline"""
-    return await click_action(85, 60, "Coordinates for Pipeline", 1, state)
-
-async def node_02_wait_10s(state: State, config: RunnableConfig) -> State:
-    """Order 2: WAIT - Sleep"""
-    return await wait_action(1, "Sleep", 2, state)
-
-async def node_03_click_borrower_input(state: State, config: RunnableConfig) -> State:
-    """Order 3: CLICK - Coordinates for Borrower Name Input Box"""
-    return await click_action(333, 234, "Coordinates for Borrower Name Input Box", 3, state)
-
-async def node_04_input_name(state: State, config: RunnableConfig) -> State:
-    """Order 4: INPUT - NAME"""
-    return await input_action(state.borrower_name, "NAME", 4, state)
-
-async def node_05_enter(state: State, config: RunnableConfig) -> State:
-    """Order 5: ENTER - ENTER"""
-    return await enter_action("ENTER", 5, state)
-
-async def node_06_wait_10s_2(state: State, config: RunnableConfig) -> State:
-    """Order 6: WAIT - Sleep"""
-    return await wait_action(3, "Sleep", 6, state)
-
-async def node_07_double_click_borrower(state: State, config: RunnableConfig) -> State:
-    """Order 7: DOUBLE-CLICK - Coordinates for borrower name from the list"""
-    return await double_click_action(184, 254, "Coordinates for borrower name from the list", 7, state)
-
-async def node_08_wait_10s_3(state: State, config: RunnableConfig) -> State:
-    """Order 8: WAIT - Sleep"""
-    return await wait_action(3, "Sleep", 8, state)
-
-async def node_09_click_services(state: State, config: RunnableConfig) -> State:
-    """Order 9: CLICK - Coordinates for Services button"""
-    return await click_action(340, 36, "Coordinates for Services button", 9, state)
-
-async def node_10_click_credit_report(state: State, config: RunnableConfig) -> State:
-    """Order 10: CLICK - Coordinates for Credit Report"""
-    return await click_action(391, 60, "Coordinates for Credit Report", 10, state)
-
-async def node_11_wait_20s(state: State, config: RunnableConfig) -> State:
-    """Order 11: WAIT - Sleep"""
-    return await wait_action(5, "Sleep", 11, state)
-
-async def node_12_click_credit_legacy(state: State, config: RunnableConfig) -> State:
-    """Order 13: CLICK - Coordinates for Advantage Credit Inc Legacy Credit"""
-    return await click_action(507, 266, "Coordinates for Advantage Credit Inc Legacy Credit", 12, state)
-
-async def node_13_click_submit(state: State, config: RunnableConfig) -> State:
-    """Order 14: CLICK - Coordinates for Submit Button"""
-    return await click_action(846, 545, "Coordinates for Submit Button", 13, state)
-
-async def node_14_wait_30s(state: State, config: RunnableConfig) -> State:
-    """Order 15: WAIT - Sleep"""
-    return await wait_action(5, "Sleep", 14, state)
-
-async def node_15_click_finish(state: State, config: RunnableConfig) -> State:
-    """Order 16: CLICK - Coordinates Finish Button"""
-    return await click_action(859, 669, "Coordinates Finish Button", 15, state)
-
-# New nodes for extended workflow
-
-async def node_16_click_okay(state: State, config: RunnableConfig) -> State:
-    """Click okay button"""
-    # return await click_action(1449, 849, "Click okay", 16, state)
-    return state
-
-
-async def node_17_wait_30s(state: State, config: RunnableConfig) -> State:
-    """Wait 30 seconds"""
-    return await wait_action(30, "Wait 10 seconds", 17, state)
-
-async def node_18_screenshot(state: State, config: RunnableConfig) -> State:
+async def node_18_screenshot(state: State) -> State:
     """Take a screenshot and store URL in state"""
-    logging.info("Taking screenshot after wait")
+    log.info("Taking screenshot after wait")
     try:
-        agent = WindowsAgent(os_url=OS_URL)
-        screenshot_result = await asyncio.to_thread(agent.screenshot)
-        
+        agent = get_agent()
+        screenshot_result = await _run_on_wa(agent.screenshot)
+
         if isinstance(screenshot_result, dict) and "url" in screenshot_result:
             state.screenshot_url = screenshot_result["url"]
-            logging.info(f"Screenshot captured: {state.screenshot_url}")
+            log.info("Screenshot captured: %.100s", state.screenshot_url)
         elif isinstance(screenshot_result, str):
             state.screenshot_url = screenshot_result
-            logging.info(f"Screenshot captured: {state.screenshot_url}")
+            log.info("Screenshot captured: %.100s", state.screenshot_url)
         elif isinstance(screenshot_result, bytes):
-            import base64
-            base64_str = base64.b64encode(screenshot_result).decode('utf-8')
-            state.screenshot_url = f"data:image/png;base64,{base64_str}"
-            logging.info("Screenshot captured as data URI")
+            # Encoding happens lazily, if and when something reads the URI
+            state.screenshot_url = LazyDataURI(screenshot_result)
+            log.info("Screenshot captured as data URI (%d bytes)", len(screenshot_result))
         else:
-            logging.warning(f"Unexpected screenshot result format: {type(screenshot_result)}")
+            log.warning("Unexpected screenshot result format: %s", type(screenshot_result))
             state.screenshot_url = None
     except Exception as e:
-        logging.exception(f"Failed to take screenshot: {e}")
+        log.error("Failed to take screenshot: %r", e)
         state.screenshot_url = None
-    
+
     state.current_node = 18
     state.status = "Success"
     return state
 
-async def node_18_click_yes(state: State, config: RunnableConfig) -> State:
-    """Click yes button"""
-    # return await click_action(1273, 855, "Click yes", 18, state)
+async def batched_click_action(steps: tuple, state: State) -> State:
+    """Run a fused run of adjacent click steps in one thread hop.
+
+    One WindowsAgent instance serves the whole run, so consecutive clicks
+    share a single agent construction and executor dispatch instead of paying
+    both per node. The wire protocol is unchanged: one CLICK per coordinate,
+    issued back-to-back.
+    """
+    agent = get_agent()
+
+    def _click_all():
+        results = []
+        for x, y, description, node_number in steps:
+            try:
+                agent.click_element(x, y)
+                results.append((node_number, None, x, y, description))
+            except Exception as e:
+                # Keep going, matching the per-node chain where a failed click
+                # did not stop the steps after it
+                results.append((node_number, e, x, y, description))
+        return results
+
+    status = "Success"
+    for node_number, error, x, y, description in await _run_on_wa(_click_all):
+        if error is None:
+            log.info("Node %d: Successfully clicked at (%d, %d) - %s", node_number, x, y, description)
+            status = "Success"
+        else:
+            log.error("Node %d: Error clicking at (%d, %d) - %s: %s", node_number, x, y, description, error)
+            status = "Error"
+        state.current_node = node_number
+
+    state.status = status
+    return state
+
+# H-Test-002 Workflow Steps (based on the JSON instructions)
+# One table entry per node: (kind, *args). run_step dispatches to the generic
+# action functions above, replacing a hand-written wrapper coroutine per node.
+ACTIONS: Dict[str, tuple] = {
+    "node_01_click_pipeline": ("click", 85, 60, "Coordinates for Pipeline", 1),
+    "node_02_wait_10s": ("wait", 1, "Sleep", 2),
+    "node_03_click_borrower_input": ("click", 333, 234, "Coordinates for Borrower Name Input Box", 3),
+    "node_04_input_name": ("input_borrower", "NAME", 4),
+    "node_05_enter": ("enter", "ENTER", 5),
+    "node_06_wait_10s_2": ("wait", 3, "Sleep", 6),
+    "node_07_double_click_borrower": ("double_click", 184, 254, "Coordinates for borrower name from the list", 7),
+    "node_08_wait_10s_3": ("wait", 3, "Sleep", 8),
+    "node_09_click_services": ("click", 340, 36, "Coordinates for Services button", 9),
+    "node_10_click_credit_report": ("click", 391, 60, "Coordinates for Credit Report", 10),
+    "node_11_wait_20s": ("wait", 5, "Sleep", 11),
+    "node_12_click_credit_legacy": ("click", 507, 266, "Coordinates for Advantage Credit Inc Legacy Credit", 12),
+    "node_13_click_submit": ("click", 846, 545, "Coordinates for Submit Button", 13),
+    "node_14_wait_30s": ("wait", 5, "Sleep", 14),
+    "node_15_click_finish": ("click", 859, 669, "Coordinates Finish Button", 15),
+    "node_16_click_okay": ("noop",),  # disabled: ("click", 1449, 849, "Click okay", 16)
+    "node_17_wait_30s": ("wait", 30, "Wait 10 seconds", 17),
+    "node_18_click_yes": ("noop",),  # disabled: ("click", 1273, 855, "Click yes", 18)
+    "node_19_click_loan": ("click", 134, 65, "Click loan", 19),
+    "node_20_click_form_tab": ("click", 28, 438, "Click form tab", 20),
+    "node_21_click_1003_form": ("click", 77, 540, "Click 1003 form", 21),
+    "node_22_click_down": ("click", 1350, 541, "Click down", 22),
+    "node_23_click_import_liability": ("click", 878, 313, "Click import liability", 23),
+    "node_24_wait_5s": ("wait", 5, "Wait 5 seconds", 24),
+    "node_25_click_import": ("click", 825, 598, "Click import", 25),
+    "node_26_click_ok": ("click", 765, 447, "Click ok", 26),
+    "node_27_wait_5s_2": ("wait", 5, "Wait 5 seconds", 27),
+    "node_28_click_close": ("click", 1339, 97, "Click close", 28),
+    # Return subgraph steps
+    "return_01_click_no": ("click", 743, 443, "Click no", 101),
+    "return_02_click_pipeline": ("click", 81, 60, "Click pipeline", 102),
+    "return_03_click_dropdown": ("click", 327, 99, "Click dropdown", 103),
+    "return_04_choose_all": ("click", 216, 117, "Choose all", 104),
+    "return_05_wait_5s": ("wait", 5, "Wait 5 seconds", 105),
+    "return_06_click_home": ("click", 23, 65, "Click home", 106),
+}
+
+PRIMITIVES = {
+    "click": click_action,
+    "double_click": double_click_action,
+    "wait": wait_action,
+    "enter": enter_action,
+}
+
+async def run_step(state: State, *, name: str) -> State:
+    """Dispatch one workflow step from the ACTIONS table."""
+    kind, *args = ACTIONS[name]
+    if kind == "noop":
+        return state
+    if kind == "input_borrower":
+        # INPUT reads its text from state at run time
+        return await input_action(state.borrower_name, *args, state)
+    return await PRIMITIVES[kind](*args, state)
+
+def _step(name: str):
+    """Bind run_step to one table entry for StateGraph registration."""
+    return functools.partial(run_step, name=name)
+
+# Step kinds that are safe to fuse into one graph node: clicks batch onto a
+# single agent and waits are just sleeps, so neither needs its own
+# transition + checkpoint
+_FUSABLE_KINDS = frozenset({"click", "wait"})
+
+async def run_segment(state: State, *, names: tuple) -> State:
+    """Run a fused sequence of click/wait steps inside one graph node.
+
+    Consecutive clicks within the segment go through batched_click_action
+    (one agent, one thread hop); waits run via the normal dispatcher.
+    """
+    clicks: list = []
+
+    async def _flush_clicks():
+        nonlocal state
+        if len(clicks) > 1:
+            state = await batched_click_action(
+                tuple(ACTIONS[n][1:] for n in clicks), state
+            )
+        elif clicks:
+            state = await run_step(state, name=clicks[0])
+        clicks.clear()
+
+    for name in names:
+        if ACTIONS[name][0] == "click":
+            clicks.append(name)
+        else:
+            await _flush_clicks()
+            state = await run_step(state, name=name)
+    await _flush_clicks()
     return state
 
-async def node_19_click_loan(state: State, config: RunnableConfig) -> State:
-    # print we are going to loan
-    return await click_action(134, 65, "Click loan", 19, state)
-
-async def node_20_click_form_tab(state: State, config: RunnableConfig) -> State:
-    """Click form tab"""
-    return await click_action(28, 438, "Click form tab", 20, state)
-
-async def node_21_click_1003_form(state: State, config: RunnableConfig) -> State:
-    """Click 1003 form"""
-    return await click_action(77, 540, "Click 1003 form", 21, state)
-
-async def node_22_click_down(state: State, config: RunnableConfig) -> State:
-    """Click down"""
-    return await click_action(1350, 541, "Click down", 22, state)
-
-async def node_23_click_import_liability(state: State, config: RunnableConfig) -> State:
-    """Click import liability"""
-    return await click_action(878, 313, "Click import liability", 23, state)
-
-async def node_24_wait_5s(state: State, config: RunnableConfig) -> State:
-    """Wait 5 seconds"""
-    return await wait_action(5, "Wait 5 seconds", 24, state)
-
-async def node_25_click_import(state: State, config: RunnableConfig) -> State:
-    """Click import"""
-    return await click_action(825, 598, "Click import", 25, state)
-
-async def node_26_click_ok(state: State, config: RunnableConfig) -> State:
-    """Click ok"""
-    return await click_action(765, 447, "Click ok", 26, state)
-
-async def node_27_wait_5s_2(state: State, config: RunnableConfig) -> State:
-    """Wait 5 seconds"""
-    return await wait_action(5, "Wait 5 seconds", 27, state)
-
-async def node_28_click_close(state: State, config: RunnableConfig) -> State:
-    """Click close"""
-    return await click_action(1339, 97, "Click close", 28, state)
-
-# Return subgraph nodes
-
-async def return_01_click_no(state: State, config: RunnableConfig) -> State:
-    """Return: Click no"""
-    return await click_action(743, 443, "Click no", 101, state)
-
-async def return_02_click_pipeline(state: State, config: RunnableConfig) -> State:
-    """Return: Click pipeline"""
-    return await click_action(81, 60, "Click pipeline", 102, state)
-
-async def return_03_click_dropdown(state: State, config: RunnableConfig) -> State:
-    """Return: Click dropdown"""
-    return await click_action(327, 99, "Click dropdown", 103, state)
-
-async def return_04_choose_all(state: State, config: RunnableConfig) -> State:
-    """Return: Choose all"""
-    return await click_action(216, 117, "Choose all", 104, state)
-
-async def return_05_wait_5s(state: State, config: RunnableConfig) -> State:
-    """Return: Wait 5 seconds"""
-    return await wait_action(5, "Wait 5 seconds", 105, state)
-
-async def return_06_click_home(state: State, config: RunnableConfig) -> State:
-    """Return: Click home"""
-    return await click_action(23, 65, "Click home", 106, state)
-
-# Create Navigation subgraph (first 10 nodes)
-navigation_graph = (
-    StateGraph(State)
-    .add_node("extract_borrower_name", extract_borrower_name)
-    .add_node("node_01_click_pipeline", node_01_click_pipeline)
-    .add_node("node_02_wait_10s", node_02_wait_10s)
-    .add_node("node_03_click_borrower_input", node_03_click_borrower_input)
-    .add_node("node_04_input_name", node_04_input_name)
-    .add_node("node_05_enter", node_05_enter)
-    .add_node("node_06_wait_10s_2", node_06_wait_10s_2)
-    .add_node("node_07_double_click_borrower", node_07_double_click_borrower)
-    .add_node("node_08_wait_10s_3", node_08_wait_10s_3)
-    .add_node("node_09_click_services", node_09_click_services)
-    .add_edge("__start__", "extract_borrower_name")
-    .add_edge("extract_borrower_name", "node_01_click_pipeline")
-    .add_edge("node_01_click_pipeline", "node_02_wait_10s")
-    .add_edge("node_02_wait_10s", "node_03_click_borrower_input")
-    .add_edge("node_03_click_borrower_input", "node_04_input_name")
-    .add_edge("node_04_input_name", "node_05_enter")
-    .add_edge("node_05_enter", "node_06_wait_10s_2")
-    .add_edge("node_06_wait_10s_2", "node_07_double_click_borrower")
-    .add_edge("node_07_double_click_borrower", "node_08_wait_10s_3")
-    .add_edge("node_08_wait_10s_3", "node_09_click_services")
-    .add_edge("node_09_click_services", "__end__")
-    .compile(name="navigation_subgraph")
-)
-
-# Create Return subgraph
-return_graph = (
-    StateGraph(State)
-    .add_node("return_01_click_no", return_01_click_no)
-    .add_node("return_02_click_pipeline", return_02_click_pipeline)
-    .add_node("return_03_click_dropdown", return_03_click_dropdown)
-    .add_node("return_04_choose_all", return_04_choose_all)
-    .add_node("return_05_wait_5s", return_05_wait_5s)
-    .add_node("return_06_click_home", return_06_click_home)
-    .add_edge("__start__", "return_01_click_no")
-    .add_edge("return_01_click_no", "return_02_click_pipeline")
-    .add_edge("return_02_click_pipeline", "return_03_click_dropdown")
-    .add_edge("return_03_click_dropdown", "return_04_choose_all")
-    .add_edge("return_04_choose_all", "return_05_wait_5s")
-    .add_edge("return_05_wait_5s", "return_06_click_home")
-    .add_edge("return_06_click_home", "__end__")
-    .compile(name="return_subgraph")
-)
-
-# Define the main graph with subgraphs
-graph = (
-    StateGraph(State)
-    .add_node("navigation", navigation_graph)
-    .add_node("node_10_click_credit_report", node_10_click_credit_report)
-    .add_node("node_11_wait_20s", node_11_wait_20s)
-    .add_node("node_12_click_credit_legacy", node_12_click_credit_legacy)
-    .add_node("node_13_click_submit", node_13_click_submit)
-    .add_node("node_14_wait_30s", node_14_wait_30s)
-    .add_node("node_15_click_finish", node_15_click_finish)
-    .add_node("node_16_click_okay", node_16_click_okay)
-    .add_node("node_17_wait_30s", node_17_wait_30s)
-    .add_node("node_18_screenshot", node_18_screenshot)
-    .add_node("node_18_click_yes", node_18_click_yes)
-    .add_node("node_19_click_loan", node_19_click_loan)
-    .add_node("node_20_click_form_tab", node_20_click_form_tab)
-    .add_node("node_21_click_1003_form", node_21_click_1003_form)
-    .add_node("node_22_click_down", node_22_click_down)
-    .add_node("node_23_click_import_liability", node_23_click_import_liability)
-    .add_node("node_24_wait_5s", node_24_wait_5s)
-    .add_node("node_25_click_import", node_25_click_import)
-    .add_node("node_26_click_ok", node_26_click_ok)
-    .add_node("node_27_wait_5s_2", node_27_wait_5s_2)
-    .add_node("node_28_click_close", node_28_click_close)
-    .add_node("return_workflow", return_graph)
-    .add_edge("__start__", "navigation")
-    .add_edge("navigation", "node_10_click_credit_report")
-    .add_edge("node_10_click_credit_report", "node_11_wait_20s")
-    .add_edge("node_11_wait_20s", "node_12_click_credit_legacy")
-    .add_edge("node_12_click_credit_legacy", "node_13_click_submit")
-    .add_edge("node_13_click_submit", "node_14_wait_30s")
-    .add_edge("node_14_wait_30s", "node_15_click_finish")
-    .add_edge("node_15_click_finish", "node_17_wait_30s")
-    .add_edge("node_17_wait_30s", "node_18_screenshot")
-    .add_edge("node_18_screenshot", "node_18_click_yes")
-    .add_edge("node_18_click_yes", "node_19_click_loan")
-    .add_edge("node_19_click_loan", "node_20_click_form_tab")
-    .add_edge("node_20_click_form_tab", "node_21_click_1003_form")
-    .add_edge("node_21_click_1003_form", "node_22_click_down")
-    .add_edge("node_22_click_down", "node_23_click_import_liability")
-    .add_edge("node_23_click_import_liability", "node_24_wait_5s")
-    .add_edge("node_24_wait_5s", "node_25_click_import")
-    .add_edge("node_25_click_import", "node_26_click_ok")
-    .add_edge("node_26_click_ok", "node_27_wait_5s_2")
-    .add_edge("node_27_wait_5s_2", "node_28_click_close")
-    .add_edge("node_28_click_close", "return_workflow")
-    .add_edge("return_workflow", "__end__")
-    .compile(
-        name="lgCreditReportUnited",
-    )
-)
\ No newline at end of file
+def _fuse_steps(names):
+    """Expand step names to (node, fn) pairs, merging adjacent click/wait runs.
+
+    A maximal run of back-to-back clicks and waits (nothing stateful between
+    them) becomes a single run_segment node: one graph transition and
+    checkpoint for the whole run instead of one per step.
+    """
+    steps = []
+    run = []
+
+    def _flush():
+        if len(run) > 1:
+            steps.append((f"{run[0]}_seg{len(run)}",
+                          functools.partial(run_segment, names=tuple(run))))
+        elif run:
+            steps.append((run[0], _step(run[0])))
+        run.clear()
+
+    for name in names:
+        if ACTIONS[name][0] in _FUSABLE_KINDS:
+            run.append(name)
+        else:
+            _flush()
+            steps.append((name, _step(name)))
+    _flush()
+    return tuple(steps)
+
+def linear(nodes, name: str):
+    """Compile a linear __start__ -> n1 -> ... -> __end__ chain.
+
+    Each subgraph is just its ordered step list; the add_node/add_edge
+    boilerplate lives here once instead of being spelled out per graph.
+    """
+    g = StateGraph(State)
+    prev = "__start__"
+    for node_name, fn in nodes:
+        g.add_node(node_name, fn)
+        g.add_edge(prev, node_name)
+        prev = node_name
+    g.add_edge(prev, "__end__")
+    return g.compile(name=name)
+
+# Stateful steps that are code rather than an ACTIONS row
+_NAMED_STEPS = {
+    "extract_borrower_name": extract_borrower_name,
+    "node_18_screenshot": node_18_screenshot,
+}
+
+# The whole workflow as data: graph name -> ordered step names. An entry that
+# is itself a key of WORKFLOW_SPEC compiles as a nested subgraph; everything
+# else resolves through _NAMED_STEPS or ACTIONS. Together with ACTIONS this
+# is the complete recording - it serializes straight to JSON for diffing or
+# versioning captured workflows.
+WORKFLOW_SPEC: Dict[str, tuple] = {
+    "navigation_subgraph": (
+        "extract_borrower_name",
+        "node_01_click_pipeline",
+        "node_02_wait_10s",
+        "node_03_click_borrower_input",
+        "node_04_input_name",
+        "node_05_enter",
+        "node_06_wait_10s_2",
+        "node_07_double_click_borrower",
+        "node_08_wait_10s_3",
+        "node_09_click_services",
+    ),
+    "return_subgraph": (
+        "return_01_click_no",
+        "return_02_click_pipeline",
+        "return_03_click_dropdown",
+        "return_04_choose_all",
+        "return_05_wait_5s",
+        "return_06_click_home",
+    ),
+    "lgCreditReportUnited": (
+        "navigation_subgraph",
+        "node_10_click_credit_report",
+        "node_11_wait_20s",
+        "node_12_click_credit_legacy",
+        "node_13_click_submit",
+        "node_14_wait_30s",
+        "node_15_click_finish",
+        "node_17_wait_30s",
+        "node_18_screenshot",
+        "node_19_click_loan",
+        "node_20_click_form_tab",
+        "node_21_click_1003_form",
+        "node_22_click_down",
+        "node_23_click_import_liability",
+        "node_24_wait_5s",
+        "node_25_click_import",
+        "node_26_click_ok",
+        "node_27_wait_5s_2",
+        "node_28_click_close",
+        "return_subgraph",
+    ),
+}
+
+@functools.cache
+def compile_from_spec(name: str):
+    """Compile one WORKFLOW_SPEC entry (and its nested subgraphs), once.
+
+    Adjacent click/wait steps fuse into run_segment nodes via _fuse_steps;
+    nested spec keys compile recursively and register under their own name.
+    Nothing is built at import - the first call pays for the build and every
+    later call gets the cached compiled graph.
+    """
+    steps = []
+    pending: list = []
+
+    def _flush():
+        if pending:
+            steps.extend(_fuse_steps(tuple(pending)))
+            pending.clear()
+
+    for entry in WORKFLOW_SPEC[name]:
+        if entry in WORKFLOW_SPEC:
+            _flush()
+            steps.append((entry, compile_from_spec(entry)))
+        elif entry in _NAMED_STEPS:
+            _flush()
+            steps.append((entry, _NAMED_STEPS[entry]))
+        else:
+            pending.append(entry)
+    _flush()
+    return linear(steps, name=name)
+
+def get_graph():
+    """Compile the main workflow graph with subgraphs, on first use."""
+    # Disabled steps are fused out of the chain instead of running as no-op
+    # graph transitions (each would still cost a full state checkpoint); their
+    # ACTIONS rows keep the original coordinates for when they are re-enabled
+    log.info("Skipping disabled steps: node_16_click_okay, node_18_click_yes")
+    return compile_from_spec("lgCreditReportUnited")
+
+def __getattr__(name):
+    # PEP 562: keep the module-level `graph` export that `langgraph dev` (and
+    # the generation prompts built from this reference file) require, while
+    # still deferring the compile to first access
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,11 +8,20 @@
 - Store the winning prompt as prompts/base.md with a version tag (e.g., v0.7). Commit it.
 """
 
-import os, json, subprocess, tempfile, hashlib, time
+import collections
+import functools
+import os, json, re, shutil, string, subprocess, hashlib, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
 
+try:
+    import orjson  # C serializer: ~5x faster than stdlib json for dumps/loads
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -22,8 +31,29 @@ BENCH_DIR = ROOT / "benchmarks" / "inputs"
 # Optional directory holding reference python scripts that produced the benchmark JSONs
 BENCH_CODE_DIR = ROOT / "benchmarks" / "code"
 
-NODE_CMD = ["npm", "run", "dev", "--", "--prompt-file"]  # calls src/index.ts
+# Invoke the local tsx binary directly when present: `npm run dev` pays a
+# shell fork plus the npm bootstrap on every run just to end up spawning
+# `tsx src/index.ts` anyway. Fall back to npm if node_modules is missing.
+_TSX_BIN = ROOT / "node_modules" / ".bin" / ("tsx.cmd" if os.name == "nt" else "tsx")
+if _TSX_BIN.exists():
+    NODE_CMD = [str(_TSX_BIN), "src/index.ts", "--prompt-stdin"]
+    NODE_SHELL = False
+else:
+    # Resolve the npm launcher to a full path (npm.cmd on Windows) so the
+    # fallback also runs without shell=True - one less cmd.exe/sh per call
+    _NPM_BIN = shutil.which("npm.cmd") or shutil.which("npm")
+    if _NPM_BIN:
+        NODE_CMD = [_NPM_BIN, "run", "dev", "--", "--prompt-stdin"]  # calls src/index.ts
+        NODE_SHELL = False
+    else:
+        NODE_CMD = ["npm", "run", "dev", "--", "--prompt-stdin"]  # calls src/index.ts
+        NODE_SHELL = True
 ENV = os.environ.copy()
+# Quiet, uncolored Node/npm output: less text to stream, decode and log
+ENV.setdefault("NO_COLOR", "1")
+ENV.setdefault("FORCE_COLOR", "0")
+ENV.setdefault("npm_config_loglevel", "error")
+ENV.setdefault("ADBLOCK", "1")  # suppress npm funding/ad banners
 NO_PR = os.getenv("NO_PR")
 # Force NO_PR during optimization to avoid PR spam
 ENV["NO_PR"] = ENV.get("NO_PR", "1")
@@ -31,16 +61,84 @@ ENV["NO_PR"] = ENV.get("NO_PR", "1")
 # Debug flag to echo full stdout/stderr
 OPT_DEBUG = os.getenv("OPT_DEBUG", "0").lower() in ("1", "true", "yes")
 
+# Worker count for the candidate x input grid; each run blocks on an external
+# subprocess, so threads suffice (no GIL contention on the wait)
+OPT_MAX_WORKERS = int(os.getenv("OPT_MAX_WORKERS", "0") or 0)
+
+# Evaluate every candidate on every input (no pruning between rounds)
+OPT_EXHAUSTIVE = os.getenv("OPT_EXHAUSTIVE", "0").lower() in ("1", "true", "yes")
+
+# Skip the content-addressed result cache (always re-run the Node pipeline)
+OPT_NO_CACHE = os.getenv("OPT_NO_CACHE", "0").lower() in ("1", "true", "yes")
+
+# RUNNER=py short-circuits Node/VibeKit and calls Anthropic in-process
+OPT_RUNNER = os.getenv("RUNNER", "node").lower()
+
 # Where to store generated artifacts (prompts + codeWrites)
 OUT_DIR = ROOT / "debug" / "optimizer" / "outputs"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Content-addressed cache of run_once results, keyed by the rendered prompt.
+# Candidates that differ only in unused placeholders or whitespace collapse to
+# the same key, so their grid cells become disk reads instead of Node runs.
+CACHE_DIR = OUT_DIR / "cache"
+
 print(ROOT)
 print(PROMPTS_DIR)
 print(CANDIDATES_DIR)
 print(BENCH_DIR)
 print(NO_PR)
 
+# JSON helpers for the grid hot paths (per-render prompt dumps, per-run temp
+# files, cache entries, artifact metadata). orjson when available, stdlib
+# otherwise; orjson emits UTF-8 bytes directly, skipping ensure_ascii escapes.
+if orjson is not None:
+    _loads = orjson.loads  # accepts str or bytes
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    def _dumps_pretty(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+else:
+    _loads = json.loads
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _dumps_pretty(obj) -> str:
+        return json.dumps(obj, indent=2)
+
+
+_PLACEHOLDER_RE = re.compile(r"(\{\{INPUT_JSON\}\}|\{\{REFERENCE_CODE\}\})")
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(prompt_template: str):
+    """Split a template around its placeholders once and return a renderer.
+
+    The returned closure joins the precomputed segments, so each render is a
+    single join instead of two full str.replace scans over the template.
+    Cached per template text, so every candidate is compiled exactly once.
+    """
+    parts = _PLACEHOLDER_RE.split(prompt_template)
+
+    def render(json_pretty: str, input_code: Optional[str]) -> str:
+        # Takes the input JSON pre-serialized: it is identical across all
+        # candidates for a given input, so serialize per input, not per render
+        out = []
+        for part in parts:
+            if part == "{{INPUT_JSON}}":
+                out.append(json_pretty)
+            elif part == "{{REFERENCE_CODE}}":
+                out.append(input_code or "")
+            else:
+                out.append(part)
+        return "".join(out)
+
+    return render
+
+
 def inject_prompt(prompt_template: str, input_json: dict, input_code: Optional[str]) -> str:
     """Render a prompt template with JSON and optional reference code.
 
@@ -48,12 +146,10 @@ def inject_prompt(prompt_template: str, input_json: dict, input_code: Optional[s
     - {{INPUT_JSON}} with pretty-printed JSON
     - {{REFERENCE_CODE}} with the provided python source or an empty string if None
     """
-    rendered = prompt_template.replace("{{INPUT_JSON}}", json.dumps(input_json, indent=2))
-    if "{{REFERENCE_CODE}}" in rendered:
-        rendered = rendered.replace("{{REFERENCE_CODE}}", input_code or "")
-    return rendered
+    return compile_template(prompt_template)(_dumps_pretty(input_json), input_code)
 
 
+@functools.lru_cache(maxsize=None)
 def find_reference_code(input_json_path: Path) -> Optional[str]:
     """Attempt to locate a reference python script corresponding to the JSON.
 
@@ -73,83 +169,268 @@ def find_reference_code(input_json_path: Path) -> Optional[str]:
         return code_py.read_text(encoding="utf-8")
     return None
 
-def run_once(rendered_prompt: str) -> dict:
-    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
-        json.dump({"prompt": rendered_prompt}, f, ensure_ascii=False)
-        tmp_path = f.name
+_WS_RE = re.compile(r"\s+")
+
+
+def _cache_keys(rendered_prompt: str) -> tuple[str, str]:
+    """Exact and whitespace-normalized sha256 keys for a rendered prompt.
+
+    The second key catches trivial candidate edits (reflowed paragraphs,
+    trailing whitespace) that cannot change the agent's behaviour.
+    """
+    exact = hashlib.sha256(rendered_prompt.encode("utf-8")).hexdigest()
+    normalized = _WS_RE.sub(" ", rendered_prompt).strip()
+    semantic = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return exact, semantic
+
+
+def _cache_lookup(keys: tuple[str, str]) -> Optional[dict]:
+    for key in keys:
+        fp = CACHE_DIR / key / "result.json"
+        if fp.exists():
+            try:
+                return _loads(fp.read_bytes())
+            except Exception:
+                pass  # corrupt entry: fall through and re-run
+    return None
+
 
-    print(f"Temp prompt file at: {tmp_path}")
+def _cache_store(keys: tuple[str, str], result: dict) -> None:
+    for key in keys:
+        entry_dir = CACHE_DIR / key
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent grid workers never see a torn file
+        tmp_fp = entry_dir / "result.json.tmp"
+        tmp_fp.write_text(_dumps(result), encoding="utf-8")
+        os.replace(tmp_fp, entry_dir / "result.json")
 
-    print(f"Running with prompt: {rendered_prompt}")
 
-    print(f"Running index.ts with command: {NODE_CMD + [tmp_path]} at {ROOT}")
+def _drain_stream(stream, log_path: Path, tail: collections.deque) -> None:
+    """Stream a subprocess pipe to disk, keeping only a bounded tail in memory.
+
+    Runs on a background thread so the pipe never fills up and blocks Node.
+    """
+    with open(log_path, "w", encoding="utf-8", errors="replace") as f:
+        for line in stream:
+            f.write(line)
+            tail.append(line.rstrip("\n"))
+    stream.close()
+
+
+def _invoke_node(stdin_payload: str, batch: bool = False):
+    """Spawn the Node runner once, piping `stdin_payload` in.
+
+    Returns (payload, returncode, stdout_tail, duration_s); payload is the
+    parsed AGENT_RESPONSE JSON or None if no block was emitted.
+    """
+    cmd = NODE_CMD + (["--batch"] if batch else [])
+    print(f"Running index.ts with command: {cmd} at {ROOT}")
 
     # Prepare debug log directory
     debug_dir = ROOT / "debug" / "optimizer"
     debug_dir.mkdir(parents=True, exist_ok=True)
     run_stamp = str(int(time.time() * 1000))
 
+    # perf_counter: monotonic and high-resolution, so the duration feeding the
+    # score penalty is immune to NTP adjustments mid-run
+    start = time.perf_counter()
+    # Stream output instead of capture_output=True: chatty agent runs can
+    # emit tens of MB, and buffering it all just to slice the tail is
+    # O(output) memory. Keep a bounded deque plus the one payload line.
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(ROOT),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        shell=NODE_SHELL,
+        env=ENV,
+        encoding="utf-8",
+        errors="replace",  # avoid cp1252 decode crashes on Windows
+    )
+
+    stdout_tail: collections.deque = collections.deque(maxlen=200)
+    stderr_tail: collections.deque = collections.deque(maxlen=200)
+    payload = None
+    capture_next = False
+
+    # Drain stderr on a background thread (also persists the full log)
+    # while the main thread walks stdout; draining both from one thread
+    # can deadlock once either pipe buffer fills
+    drainer = threading.Thread(
+        target=_drain_stream,
+        args=(proc.stderr, debug_dir / f"stderr_{run_stamp}.log", stderr_tail),
+        daemon=True,
+    )
+    drainer.start()
+
+    # Pipe the payload straight to Node (index.ts --prompt-stdin reads fd 0
+    # to EOF before emitting output): no temp file write/read/unlink cycle
+    proc.stdin.write(stdin_payload)
+    proc.stdin.close()
+
+    with open(debug_dir / f"stdout_{run_stamp}.log", "w", encoding="utf-8", errors="replace") as log_f:
+        for line in proc.stdout:
+            log_f.write(line)
+            stripped = line.rstrip("\n")
+            stdout_tail.append(stripped)
+            if capture_next:
+                if payload is None:
+                    try:
+                        payload = _loads(stripped)
+                    except Exception:
+                        payload = None
+                capture_next = False
+            elif stripped == "AGENT_RESPONSE_START":
+                capture_next = True
+
+    proc.wait()
+    drainer.join()
+    duration = time.perf_counter() - start
+
+    stdout_text = "\n".join(stdout_tail)
+
+    if OPT_DEBUG:
+        print("--- STDOUT (tail) ---")
+        print(stdout_text[-2000:])
+        print("--- STDERR (tail) ---")
+        print("\n".join(stderr_tail)[-2000:])
+
+    return payload, proc.returncode, stdout_text, duration
+
+
+def _result_from_payload(payload: dict, returncode, duration_s: float, stdout_tail: str) -> dict:
+    """Normalize one Node payload into the result dict used for scoring."""
+    code_writes = []
     try:
-        start = time.time()
-        proc = subprocess.run(
-            NODE_CMD + [tmp_path],
-            cwd=str(ROOT),
-            capture_output=True,
-            text=True,
-            shell=True,
-            env=ENV,
-            encoding="utf-8",
-            errors="replace",  # avoid cp1252 decode crashes on Windows
-        )
-        duration = time.time() - start
-        stdout_text = proc.stdout or ""
-        stderr_text = proc.stderr or ""
+        cw = payload.get("codeWrites")
+        if isinstance(cw, list):
+            for item in cw:
+                if isinstance(item, dict) and "path" in item and "content" in item:
+                    code_writes.append({
+                        "path": str(item.get("path")),
+                        "content": str(item.get("content", ""))
+                    })
+    except Exception:
+        pass
+
+    return {
+        "exit_code": int(payload.get("exitCode", returncode if returncode is not None else 1)),
+        "error": payload.get("error"),
+        "duration_s": round(duration_s, 2),
+        "raw_tail": stdout_tail[-1000:],
+        "code_writes": code_writes,
+    }
 
-        # Save raw logs to files for post-mortem debugging
-        (debug_dir / f"stdout_{run_stamp}.log").write_text(stdout_text, encoding="utf-8", errors="replace")
-        (debug_dir / f"stderr_{run_stamp}.log").write_text(stderr_text, encoding="utf-8", errors="replace")
 
-        if OPT_DEBUG:
-            print("--- STDOUT (tail) ---")
-            print(stdout_text[-2000:])
-            print("--- STDERR (tail) ---")
-            print(stderr_text[-2000:])
+@functools.lru_cache(maxsize=1)
+def _anthropic_client():
+    from anthropic import Anthropic  # lazy: only the py runner needs it
+    # One shared client = one pooled HTTP connection across every run
+    return Anthropic()
 
-        stdout = stdout_text.splitlines()
 
-        try:
-            s_idx = stdout.index("AGENT_RESPONSE_START")
-            e_idx = stdout.index("AGENT_RESPONSE_END")
-            payload = json.loads(stdout[s_idx + 1])
-        except Exception:
-            payload = {
-                "exitCode": proc.returncode if proc.returncode is not None else 1,
-                "error": "No AGENT_RESPONSE block",
-                "raw": stdout_text[-1000:],
-            }
+_CODE_FENCE_RE = re.compile(r"```(?:python|py)?\s*\n(.*?)```", re.S)
 
-        code_writes = []
-        try:
-            cw = payload.get("codeWrites")
-            if isinstance(cw, list):
-                for item in cw:
-                    if isinstance(item, dict) and "path" in item and "content" in item:
-                        code_writes.append({
-                            "path": str(item.get("path")),
-                            "content": str(item.get("content", ""))
-                        })
-        except Exception:
-            pass
 
+def _python_run_one(rendered_prompt: str) -> dict:
+    """In-process runner (RUNNER=py): one Anthropic call, no Node/E2B hop.
+
+    Mirrors the result shape of the Node pipeline's local fallback: the first
+    fenced code block in the response becomes the single code write, and
+    exit_code reflects whether one was produced.
+    """
+    start = time.perf_counter()
+    try:
+        response = _anthropic_client().messages.create(
+            model="claude-sonnet-4-20250514",
+            max_tokens=8000,
+            messages=[{"role": "user", "content": rendered_prompt}],
+        )
+        text = "".join(
+            block.text for block in response.content
+            if getattr(block, "type", "") == "text"
+        )
+        m = _CODE_FENCE_RE.search(text)
+        code_writes = ([{"path": "generated_graph.py", "content": m.group(1).strip()}]
+                       if m else [])
         return {
-            "exit_code": int(payload.get("exitCode", proc.returncode if proc.returncode is not None else 1)),
-            "error": payload.get("error"),
-            "duration_s": round(duration, 2),
-            "raw_tail": stdout_text[-1000:],
+            "exit_code": 0 if code_writes else 1,
+            "error": None if code_writes else "No code block in response",
+            "duration_s": round(time.perf_counter() - start, 2),
+            "raw_tail": text[-1000:],
             "code_writes": code_writes,
         }
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
+    except Exception as e:
+        return {
+            "exit_code": 1,
+            "error": str(e),
+            "duration_s": round(time.perf_counter() - start, 2),
+            "raw_tail": "",
+            "code_writes": [],
+        }
+
+
+def batch_run(rendered_list: list[str]) -> list[dict]:
+    """Run several rendered prompts through one Node process (--batch).
+
+    Node fans the batch out with Promise.all, so model calls overlap and the
+    tsx bootstrap plus HTTP client setup are paid once instead of N times.
+    Cache hits are filled in locally and only misses cross the boundary.
+    """
+    results: list[Optional[dict]] = [None] * len(rendered_list)
+    keys_list: list = [None] * len(rendered_list)
+    pending = []
+    for i, rendered in enumerate(rendered_list):
+        if not OPT_NO_CACHE:
+            keys_list[i] = _cache_keys(rendered)
+            cached = _cache_lookup(keys_list[i])
+            if cached is not None:
+                print(f"Cache hit for prompt {keys_list[i][0][:12]}")
+                results[i] = cached
+                continue
+        pending.append(i)
+
+    if pending:
+        if OPT_RUNNER == "py":
+            # In-process fast path: no subprocess fork or tsx boot; overlap
+            # the model calls like the Node batch does with Promise.all
+            with ThreadPoolExecutor(max_workers=min(8, len(pending))) as prun:
+                run_results = list(prun.map(
+                    _python_run_one, (rendered_list[i] for i in pending)))
+            for i, res in zip(pending, run_results):
+                if keys_list[i] is not None and res["exit_code"] == 0:
+                    _cache_store(keys_list[i], res)
+                results[i] = res
+            return results
+
+        payload, returncode, stdout_text, duration = _invoke_node(
+            _dumps({"prompts": [rendered_list[i] for i in pending]}), batch=True)
+        items = payload.get("results") if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            items = []
+        # Wall time is shared by the whole batch; split it evenly so the
+        # duration penalty in score_result stays comparable across batch sizes
+        per_item_s = duration / len(pending)
+        for slot, i in enumerate(pending):
+            item = items[slot] if slot < len(items) and isinstance(items[slot], dict) else {
+                "exitCode": returncode if returncode is not None else 1,
+                "error": "No AGENT_RESPONSE block",
+                "raw": stdout_text[-1000:],
+            }
+            res = _result_from_payload(item, returncode, per_item_s, stdout_text)
+            # Only memoize clean runs; failures may be transient (timeouts,
+            # rate limits) and should stay retryable
+            if keys_list[i] is not None and res["exit_code"] == 0:
+                _cache_store(keys_list[i], res)
+            results[i] = res
+
+    return results
+
+
+def run_once(rendered_prompt: str) -> dict:
+    return batch_run([rendered_prompt])[0]
 
 def score_result(res: dict) -> float:
     # Baseline: require success AND at least one code file written
@@ -158,7 +439,23 @@ def score_result(res: dict) -> float:
     return max(0.0, base - penalty)
 
 
+# Run directories already created this process (save_artifacts)
+_KNOWN_RUN_DIRS: set = set()
+
+# Map every disallowed ASCII char to "_" once, so sanitizing is one C-level
+# translate instead of a Python-level branch per character
+_SANITIZE_ALLOWED = frozenset(string.ascii_letters + string.digits + "-_.")
+_SANITIZE_TABLE = str.maketrans(
+    {c: "_" for c in map(chr, range(128)) if c not in _SANITIZE_ALLOWED}
+)
+
+
+@functools.lru_cache(maxsize=1024)
 def _sanitize(name: str) -> str:
+    # Candidate/input stems repeat across the whole grid, so cache the scans
+    if name.isascii():
+        return name.translate(_SANITIZE_TABLE)[:80]
+    # Non-ASCII path keeps the unicode isalnum() semantics (letters pass)
     return "".join(c if c.isalnum() or c in ("-", "_", ".") else "_" for c in name)[:80]
 
 
@@ -170,7 +467,11 @@ def save_artifacts(candidate_path: Path, input_path: Path, rendered_prompt: str,
     cand_stem = _sanitize(candidate_path.stem)
     inp_stem = _sanitize(input_path.stem)
     run_dir = OUT_DIR / cand_stem / inp_stem
-    run_dir.mkdir(parents=True, exist_ok=True)
+    # Skip the stat/mkdir syscalls once a run dir is known to exist (re-runs
+    # of the same cell land in the same directory)
+    if run_dir not in _KNOWN_RUN_DIRS:
+        run_dir.mkdir(parents=True, exist_ok=True)
+        _KNOWN_RUN_DIRS.add(run_dir)
 
     # Save prompt
     (run_dir / "prompt.txt").write_text(rendered_prompt, encoding="utf-8")
@@ -191,51 +492,158 @@ def save_artifacts(candidate_path: Path, input_path: Path, rendered_prompt: str,
         "input": str(input_path),
         "files": saved,
     }
-    (run_dir / "metadata.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    (run_dir / "metadata.json").write_text(_dumps_pretty(meta), encoding="utf-8")
 
     return run_dir
 
+def evaluate_batch(cand: Path, round_inputs: list, tpl: str,
+                   writer: ThreadPoolExecutor) -> tuple[list[dict], list]:
+    """Run one candidate over a round of inputs via a single batched Node call.
+
+    Candidates are independent, so each is one pool job per round; the Node
+    side overlaps the model calls within the batch. The pre-serialized inputs
+    and reference code come from main()'s cache. Artifact writes go to the
+    `writer` pool so scoring never blocks on disk; the returned futures are
+    drained once at the end of the grid.
+    """
+    render = compile_template(tpl)
+    rendered = [render(json_pretty, input_code)
+                for _, json_pretty, input_code in round_inputs]
+    res_list = batch_run(rendered)
+
+    entries = []
+    writes = []
+    for (inp, _, _), rendered_prompt, res in zip(round_inputs, rendered, res_list):
+        # Save artifacts for later scoring/inspection (fire-and-collect: the
+        # target directory is deterministic, so record it without waiting)
+        writes.append(writer.submit(
+            save_artifacts, cand, inp, rendered_prompt, res.get("code_writes") or []))
+        art_dir = OUT_DIR / _sanitize(cand.stem) / _sanitize(inp.stem)
+
+        entries.append({
+            "candidate": str(cand),
+            "input": str(inp),
+            "artifact_dir": str(art_dir),
+            "result": res,
+        })
+    return entries, writes
+
+
+@dataclass
+class CandidateStats:
+    """Single-pass accumulator per candidate: each result is touched once."""
+    total: float = 0.0
+    n: int = 0
+    failures: int = 0
+
+    def add(self, res: dict) -> None:
+        self.total += score_result(res)
+        self.n += 1
+        self.failures += res["exit_code"] != 0
+
+    @property
+    def avg(self) -> float:
+        return self.total / max(1, self.n)
+
+
 def main():
     candidates = sorted(CANDIDATES_DIR.glob("*.md"))
-    # print(BENCH_DIR)
     inputs = sorted(BENCH_DIR.glob("*.json"))
-    # print(candidates)
-    # print(inputs)
     if not candidates or not inputs:
         raise SystemExit("No candidates or inputs found.")
 
+    # One batched Node call per candidate per round; each blocks tens of
+    # seconds in an external subprocess, so threads suffice
+    max_workers = OPT_MAX_WORKERS or min(len(candidates),
+                                         (os.cpu_count() or 4) * 2)
+
+    # Parse, pretty-print and resolve reference code for every input once up
+    # front - the same I inputs would otherwise be re-read, re-parsed and
+    # re-serialized per candidate
+    inputs_cache = [
+        (inp,
+         _dumps_pretty(_loads(inp.read_bytes())),  # read_bytes skips a decode pass
+         find_reference_code(inp))
+        for inp in inputs
+    ]
+
+    templates = {cand: cand.read_text(encoding="utf-8") for cand in candidates}
+
+    # Deduplicate candidates that are identical modulo whitespace: tuners emit
+    # plenty of near-copies (reflowed comments, blank lines). One
+    # representative per group runs; the rest inherit its stats verbatim.
+    groups: dict = {}
+    for cand in candidates:
+        norm = _WS_RE.sub(" ", templates[cand]).strip()
+        h = hashlib.blake2b(norm.encode("utf-8"), digest_size=16).hexdigest()
+        groups.setdefault(h, []).append(cand)
+    dup_of = {dup: members[0] for members in groups.values() for dup in members[1:]}
+    reps = [cand for cand in candidates if cand not in dup_of]
+    if dup_of:
+        print(f"Deduplicated candidates: {len(reps)}/{len(candidates)} unique modulo whitespace")
+
+    # Successive halving: run the inputs in rounds and drop below-median
+    # candidates between rounds, so hopeless prompts stop consuming subprocess
+    # launches. OPT_EXHAUSTIVE=1 restores the full C x I grid.
+    round_size = len(inputs) if OPT_EXHAUSTIVE else max(4, len(inputs) // 4)
+
+    per_cand = {cand: CandidateStats() for cand in reps}
+    survivors = list(reps)
+    pending_writes = []  # artifact-write futures, drained after the grid
+
+    # Append-only JSONL index: every run is persisted as it is scored, so a
+    # crash keeps all results so far and the full result dicts (raw_tail
+    # included) never accumulate in memory
+    index_fp = OUT_DIR / "artifacts_index.jsonl"
+
+    # Dedicated small pool for artifact writes: IO-bound, so two threads keep
+    # up while the main pool immediately launches the next Node batch
+    with open(index_fp, "a", encoding="utf-8") as index_f, \
+            ThreadPoolExecutor(max_workers=max_workers) as pool, \
+            ThreadPoolExecutor(max_workers=2) as writer:
+        for start in range(0, len(inputs_cache), round_size):
+            round_inputs = inputs_cache[start:start + round_size]
+
+            # (cand, future), in deterministic submission order: no locks
+            # needed, stable artifact index
+            jobs = [
+                (cand, pool.submit(evaluate_batch, cand, round_inputs, templates[cand], writer))
+                for cand in survivors
+            ]
+            for cand, future in jobs:
+                entries, writes = future.result()
+                pending_writes.extend(writes)
+                stats = per_cand[cand]
+                for entry in entries:
+                    stats.add(entry["result"])
+                    index_f.write(_dumps(entry) + "\n")
+                index_f.flush()  # per finished job: keep the index crash-current
+
+            # Prune before the next round (never below one survivor)
+            more_rounds = start + round_size < len(inputs_cache)
+            if not OPT_EXHAUSTIVE and more_rounds and len(survivors) > 1:
+                avgs = {c: per_cand[c].avg for c in survivors}
+                median = sorted(avgs.values())[len(avgs) // 2]
+                kept = [c for c in survivors if avgs[c] >= median]
+                dropped = [c for c in survivors if c not in kept]
+                if kept and dropped:
+                    for c in dropped:
+                        print(f"Pruned candidate after {per_cand[c].n} inputs: {c.name}")
+                    survivors = kept
+
+    # Surface any artifact-write failures now that the grid is done
+    for fut in pending_writes:
+        try:
+            fut.result()
+        except Exception as e:
+            if OPT_DEBUG:
+                print(f"Failed to save artifacts: {e}")
+
     leaderboard = []
-    artifacts_index = []  # collect artifact locations for all runs
     for cand in candidates:
-        tpl = cand.read_text(encoding="utf-8")
-        total, n = 0.0, 0
-        failures = 0
-
-        for inp in inputs:
-            input_json = json.loads(inp.read_text(encoding="utf-8"))
-            input_code = find_reference_code(inp)
-            rendered = inject_prompt(tpl, input_json, input_code)
-            res = run_once(rendered)
-            # Save artifacts for later scoring/inspection
-            try:
-                art_dir = save_artifacts(cand, inp, rendered, res.get("code_writes") or [])
-            except Exception as e:
-                art_dir = None
-                if OPT_DEBUG:
-                    print(f"Failed to save artifacts for {cand.name} / {inp.name}: {e}")
-
-            total += score_result(res)
-            n += 1
-            failures += int(res["exit_code"] != 0)
-            artifacts_index.append({
-                "candidate": str(cand),
-                "input": str(inp),
-                "artifact_dir": str(art_dir) if art_dir else None,
-                "result": res,
-            })
-
-        avg = total / max(1, n)
-        leaderboard.append((avg, failures, cand))
+        # Duplicates score as their representative
+        stats = per_cand[dup_of.get(cand, cand)]
+        leaderboard.append((stats.avg, stats.failures, cand))
 
     leaderboard.sort(key=lambda x: (-x[0], x[1], str(x[2])))
     print("\nPrompt Leaderboard (avg_score desc, failures asc):")
@@ -247,10 +655,7 @@ def main():
     # Copy best to prompts/base.md for promotion
     (PROMPTS_DIR / "base.md").write_text(best.read_text(encoding="utf-8"), encoding="utf-8")
 
-    # Write a summary index for all artifacts and results
-    index_fp = OUT_DIR / "artifacts_index.json"
-    index_fp.write_text(json.dumps(artifacts_index, indent=2), encoding="utf-8")
-    print(f"Artifacts index written to: {index_fp}")
+    print(f"Artifacts index appended to: {index_fp}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -8,11 +8,16 @@ config();
 
 // Parse command line arguments
 const args = process.argv.slice(2);
-const promptFilePath = args[args.indexOf('--prompt-file') + 1];
-
-// Read prompt from file
-const promptData = JSON.parse(fs.readFileSync(promptFilePath, 'utf-8'));
-const prompt = promptData.prompt;
+const useStdin = args.includes('--prompt-stdin');
+const useBatch = args.includes('--batch');
+const promptFilePath = useStdin ? '<stdin>' : args[args.indexOf('--prompt-file') + 1];
+
+// Read prompt JSON from stdin (fd 0, read to EOF) or from --prompt-file.
+// Single mode: {"prompt": "..."}; batch mode: {"prompts": ["...", ...]}
+const promptData = JSON.parse(
+  useStdin ? fs.readFileSync(0, 'utf-8') : fs.readFileSync(promptFilePath, 'utf-8')
+);
+const prompts: string[] = useBatch ? (promptData.prompts || []) : [promptData.prompt];
 // Control whether to open a PR (used by offline prompt optimization)
 const NO_PR = (process.env.NO_PR || '').toLowerCase() === '1' || (process.env.NO_PR || '').toLowerCase() === 'true';
 const githubRepoUrl = process.env.TARGET_GITHUB_REPO!;
@@ -21,15 +26,15 @@ const GITHUB_ENABLED = ((process.env.GITHUB_ENABLED || '').toLowerCase() === '1'
   || (process.env.GITHUB_ENABLED || '').toLowerCase() === 'true'
   || (!!process.env.GITHUB_TOKEN && !!process.env.TARGET_GITHUB_REPO));
 
-// Create E2B sandbox provider
+// Create E2B sandbox provider (shared factory; each run gets its own sandbox)
 const e2bProvider = createE2BProvider({
   apiKey: process.env.E2B_API_KEY!,
   templateId: 'vibekit-claude',
 });
 
-// Debug 
+// Debug
 console.log(promptFilePath,
-  prompt,
+  `${prompts.length} prompt(s)`,
   NO_PR,
   githubRepoUrl,
   process.env.E2B_API_KEY,
@@ -39,73 +44,75 @@ console.log(promptFilePath,
   process.env.NO_PR,
 );
 
-// Initialize VibeKit with sandbox provider
-const vibekit = new VibeKit()
-  .withAgent({
-    type: 'claude',
-    provider: 'anthropic',
-    apiKey: process.env.ANTHROPIC_API_KEY || 'your-anthropic-api-key-here',
-    model: 'claude-sonnet-4-20250514',
-  })
-  .withSandbox(e2bProvider)
-  .withWorkingDirectory(`/tmp/vibekit-${Date.now()}`)
-  .withTelemetry({ enabled: true })
-  // .withSession("inyiby662ion9qzcfqiss")
-  .withGithub({
-    token: process.env.GITHUB_TOKEN!, 
-    repository: githubRepoUrl, 
-  });
-
-// Collect streaming artifacts
-const assistantTexts: string[] = [];
-const streamedWrites: Array<{ path: string; content: string }> = [];
-
-// Set up event listeners for streaming
-vibekit.on("update", (message) => {
-  // Handle streaming updates
-  console.log('Streaming update:', message, '\n\n');
+// Generate code for one prompt and create a PR (first time) or push to branch (subsequent times)
+// This implements iterative development: PR on first success, pushToBranch for retries/iterations
+// Returns the compact payload object surfaced to Python; every run owns its
+// VibeKit instance and streaming buffers so batch runs can overlap safely.
+async function runPrompt(prompt: string): Promise<any> {
+  // Collect streaming artifacts (per run, not shared across the batch)
+  const assistantTexts: string[] = [];
+  const streamedWrites: Array<{ path: string; content: string }> = [];
+
+  // Initialize VibeKit with sandbox provider
+  const vibekit = new VibeKit()
+    .withAgent({
+      type: 'claude',
+      provider: 'anthropic',
+      apiKey: process.env.ANTHROPIC_API_KEY || 'your-anthropic-api-key-here',
+      model: 'claude-sonnet-4-20250514',
+    })
+    .withSandbox(e2bProvider)
+    .withWorkingDirectory(`/tmp/vibekit-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`)
+    .withTelemetry({ enabled: true })
+    // .withSession("inyiby662ion9qzcfqiss")
+    .withGithub({
+      token: process.env.GITHUB_TOKEN!,
+      repository: githubRepoUrl,
+    });
+
+  // Set up event listeners for streaming
+  vibekit.on("update", (message) => {
+    // Handle streaming updates
+    console.log('Streaming update:', message, '\n\n');
 
-  try {
-    if (message?.type === 'assistant' && message?.message?.content && Array.isArray(message.message.content)) {
-      for (const item of message.message.content as Array<any>) {
-        if (item?.type === 'text' && typeof item?.text === 'string') {
-          assistantTexts.push(item.text);
-        }
-        if (
-          item?.type === 'tool_use' &&
-          item?.name === 'Write' &&
-          item?.input?.file_path &&
-          typeof item?.input?.content === 'string'
-        ) {
-          streamedWrites.push({ path: String(item.input.file_path), content: String(item.input.content) });
+    try {
+      if (message?.type === 'assistant' && message?.message?.content && Array.isArray(message.message.content)) {
+        for (const item of message.message.content as Array<any>) {
+          if (item?.type === 'text' && typeof item?.text === 'string') {
+            assistantTexts.push(item.text);
+          }
+          if (
+            item?.type === 'tool_use' &&
+            item?.name === 'Write' &&
+            item?.input?.file_path &&
+            typeof item?.input?.content === 'string'
+          ) {
+            streamedWrites.push({ path: String(item.input.file_path), content: String(item.input.content) });
+          }
         }
       }
+    } catch {
+      // ignore parse errors
     }
-  } catch {
-    // ignore parse errors
-  }
-});
+  });
 
-// Set up error listener
-vibekit.on("error", (error) => {
-  // Handle streaming errors
-  console.error('Streaming error:', error, '\n\n');
-});
+  // Set up error listener
+  vibekit.on("error", (error) => {
+    // Handle streaming errors
+    console.error('Streaming error:', error, '\n\n');
+  });
 
-console.log('VibeKit initialized successfully!');
+  console.log('VibeKit initialized successfully!');
 
-// Get the current session ID
-const sessionId = await vibekit.getSession();
+  // Get the current session ID
+  const sessionId = await vibekit.getSession();
 
-if (sessionId) {
-  console.log("Current session:", sessionId);
-} else {
-  console.log("No active session");
-}
+  if (sessionId) {
+    console.log("Current session:", sessionId);
+  } else {
+    console.log("No active session");
+  }
 
-// Generate code from a static prompt and create a PR (first time) or push to branch (subsequent times)
-// This implements iterative development: PR on first success, pushToBranch for retries/iterations
-async function generateFromStaticPrompt() {
   console.log('Generating code from static prompt...');
 
   // Use a deterministic feature branch for each run
@@ -162,12 +169,12 @@ async function generateFromStaticPrompt() {
       try {
         console.log('Resetting sandbox before next attempt...');
         await vibekit.kill();
-        
+
         // Force creation of a completely new sandbox by clearing the sandbox ID
         // This prevents reusing the corrupted sandbox from the previous attempt
         console.log('Forcing new sandbox creation...');
         await vibekit.setSession(null as any);
-        
+
         // Add delay to ensure complete cleanup
         await sleep(3000);
         console.log('Ready for fresh sandbox attempt...');
@@ -226,7 +233,7 @@ async function generateFromStaticPrompt() {
     // Try assistant texts first, then fallback to stdout
     let sourceText = '';
     let source = '';
-    
+
     if (assistantTexts.length > 0) {
       sourceText = assistantTexts.join('\n\n');
       source = 'assistantTexts';
@@ -236,23 +243,22 @@ async function generateFromStaticPrompt() {
       source = 'stdout';
       console.log('🔍 Using stdout for code extraction (assistantTexts empty)');
     }
-    
+
     if (sourceText) {
       const code = extractFirstCodeBlock(sourceText);
       if (code) {
       // Save locally as fallback instead of trying GitHub operations
       const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
       const localFilename = `generated_graph_${timestamp}.py`;
-      
+
       try {
         fs.writeFileSync(localFilename, code, 'utf-8');
         console.log(`\n🚀 FALLBACK: Code saved locally to ${localFilename}`);
         console.log(`📝 Reason: Claude generated code but didn't write to repository`);
         console.log(`📄 Source: Extracted from ${source}`);
-        
-        // Surface a compact, parseable result back to Python (skip GitHub operations)
-        console.log('AGENT_RESPONSE_START');
-        console.log(JSON.stringify({
+
+        // Compact, parseable result back to Python (skip GitHub operations)
+        return {
           response: `Code saved locally to ${localFilename} (no GitHub operations)`,
           exitCode: result!.exitCode,
           error: result!.stderr,
@@ -262,10 +268,7 @@ async function generateFromStaticPrompt() {
           branchName: featureBranch,
           localFallback: true,
           localFile: localFilename
-        }));
-        console.log('AGENT_RESPONSE_END');
-        
-        return result;
+        };
       } catch (saveError) {
         console.error(`Failed to save code locally: ${saveError}`);
         // Continue with original flow if local save fails
@@ -335,9 +338,8 @@ async function generateFromStaticPrompt() {
       }
     }
 
-  // Surface a compact, parseable result back to Python
-    console.log('AGENT_RESPONSE_START');
-    console.log(JSON.stringify({
+  // Compact, parseable result back to Python
+    const payload = {
       response: responseMsg,
       exitCode: result!.exitCode,
       error: result!.stderr,
@@ -349,8 +351,7 @@ async function generateFromStaticPrompt() {
         branchName: createdPR.branchName
       } : null,
       branchName: featureBranch,
-    }));
-    console.log('AGENT_RESPONSE_END');
+    };
 
     // Always try to kill the sandbox at the end of a run to avoid residual state
     try {
@@ -360,12 +361,39 @@ async function generateFromStaticPrompt() {
       // ignore cleanup errors
     }
 
-    return result;
+    return payload;
   }
 }
 
-// Run the example
-generateFromStaticPrompt()
+// Run every prompt concurrently (Promise.all amortizes process startup and
+// HTTP client setup across the batch; per-prompt failures become error
+// payloads instead of sinking the whole batch), then emit one response block.
+async function main() {
+  const payloads = await Promise.all(prompts.map(async (p) => {
+    try {
+      return await runPrompt(p);
+    } catch (error: any) {
+      return {
+        error: {
+          message: error.message,
+          stack: error.stack,
+          name: error.name
+        },
+        exitCode: 1,
+        stdout: '',
+        stderr: error.message,
+        parsedStdout: []
+      };
+    }
+  }));
+
+  // Single-line JSON so line-oriented consumers can grab it after the marker
+  console.log('AGENT_RESPONSE_START');
+  console.log(JSON.stringify(useBatch ? { results: payloads } : payloads[0]));
+  console.log('AGENT_RESPONSE_END');
+}
+
+main()
   .catch(error => {
     // Log errors in the same debug-friendly format
     console.log('AGENT_RESPONSE_START');
@@ -379,16 +407,11 @@ generateFromStaticPrompt()
       stdout: '',
       stderr: error.message,
       parsedStdout: []
-    }, null, 2));
+    }));
     console.log('AGENT_RESPONSE_END');
     process.exit(1);
   });
 
-// TODO: Uncomment out later
-// // Kill the sandbox when done
-// await vibekit.kill();
-// console.log("Sandbox terminated successfully");
-
 // Helpers
 function extractFirstCodeBlock(text: string): string | null {
   if (!text) return null;
@@ -408,4 +431,4 @@ function extractFirstCodeBlock(text: string): string | null {
   }
   const chosen = python || first;
   return chosen ? chosen.code.trim() : null;
-}
\ No newline at end of file
+}
@@ -3,7 +3,7 @@
 Test the automatic package installation feature
 """
 
-from graph5 import extract_required_packages, install_packages_in_sandbox, create_sandbox
+from graph5 import extract_required_packages, install_packages_in_sandbox, create_sandbox, release_sandbox
 import os
 from dotenv import load_dotenv
 
@@ -83,9 +83,9 @@ except ImportError as e:
         else:
             print("⚠️ Package installation had issues")
         
-        # Cleanup
-        sandbox.kill()
-        print("✅ Sandbox cleaned up")
+        # Return the sandbox to the warm pool (instead of killing it) so
+        # back-to-back runs resume it with the packages already installed
+        release_sandbox(sandbox)
         
         return success
         
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
-import json
+import array
 import asyncio
+import functools
 import logging
-import base64
-from typing import Union, Dict, Any, Optional
-from pydantic import BaseModel
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # SIMD base64 (AVX2/NEON): several times faster on megabyte screenshots
+    from pybase64 import b64encode as _b64encode
+except ImportError:
+    from base64 import b64encode as _b64encode
+from typing import Union, Dict, Any, Optional, TypedDict
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 
@@ -16,18 +25,26 @@ from langgraph.graph import StateGraph
 GRAPH_NAME = "encompass_workflow"
 OS_URL = "https://fintor-dev-recording.ngrok.app"
 
+# Module logger with lazy %-style formatting: messages are only built when a
+# handler will actually emit them, so silenced INFO logs cost nothing per step
+_LOG = logging.getLogger(__name__)
+
 # =============================================================================
 # STATE DEFINITION
 # =============================================================================
 
-class State(BaseModel):
-    """State for the Encompass workflow."""
-    user_input: Union[str, Dict[str, Any], None] = None
-    current_node: int = 0
-    status: str = ""
-    has_error: bool = False
-    screenshot_url: Optional[str] = None
-    typed_text: str = ""
+class State(TypedDict, total=False):
+    """State for the Encompass workflow.
+
+    A TypedDict is LangGraph-native: node returns merge as partial updates
+    with no Pydantic validation pass at each node boundary.
+    """
+    user_input: Union[str, Dict[str, Any], None]
+    current_node: int
+    status: str
+    has_error: bool
+    screenshot_url: Optional[str]
+    typed_text: str
 
 # =============================================================================
 # AGENT INTEGRATION LAYER
@@ -38,406 +55,374 @@ class _BaseAgent:
     async def double_click(self, x: int, y: int) -> None: ...
     async def input_text(self, text: str) -> None: ...
     async def press_enter(self) -> None: ...
-    async def screenshot(self) -> Union[str, bytes, Dict[str, Any]]: ...
+    async def screenshot(self) -> str: ...
 
 class _SimAgent(_BaseAgent):
     async def click(self, x: int, y: int):
-        logging.info(f"[SIM] click({x},{y})")
+        _LOG.info("[SIM] click(%d,%d)", x, y)
         await asyncio.sleep(0.05)
     
     async def double_click(self, x: int, y: int):
-        logging.info(f"[SIM] double_click({x},{y})")
+        _LOG.info("[SIM] double_click(%d,%d)", x, y)
         await asyncio.sleep(0.08)
     
     async def input_text(self, text: str):
-        logging.info(f"[SIM] input_text({text!r})")
+        _LOG.info("[SIM] input_text(%r)", text)
         await asyncio.sleep(0.05)
     
     async def press_enter(self):
-        logging.info("[SIM] press_enter()")
+        _LOG.info("[SIM] press_enter()")
         await asyncio.sleep(0.03)
     
     async def screenshot(self):
-        logging.info("[SIM] screenshot()")
+        _LOG.info("[SIM] screenshot()")
         await asyncio.sleep(0.1)
         return "data:image/png;base64,placeholder"
 
 class _WindowsAgentAdapter(_BaseAgent):
     def __init__(self, wa: Any):
         self._a = wa
-    
+        # One pinned worker for every blocking agent call: the remote OS only
+        # takes one action at a time, and a dedicated thread skips the
+        # per-call contextvars copy and default-executor contention of
+        # asyncio.to_thread while letting the client keep one live session
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wa")
+
+    def _call(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(fn, *args)
+        )
+
     async def click(self, x: int, y: int):
-        await asyncio.to_thread(self._a.click_element, x, y)
-    
+        await self._call(self._a.click_element, x, y)
+
     async def double_click(self, x: int, y: int):
         payload = {"action": "DOUBLE-CLICK", "coordinate": [x, y], "value": "value", "model_selected": "claude"}
-        await asyncio.to_thread(self._a.act, payload)
-    
+        await self._call(self._a.act, payload)
+
     async def input_text(self, text: str):
         payload = {"action": "INPUT", "coordinate": [0, 0], "value": text, "model_selected": "claude"}
-        await asyncio.to_thread(self._a.act, payload)
-    
+        await self._call(self._a.act, payload)
+
     async def press_enter(self):
         payload = {"action": "ENTER", "coordinate": [0, 0], "value": "", "model_selected": "claude"}
-        await asyncio.to_thread(self._a.act, payload)
-    
-    async def screenshot(self):
-        return await asyncio.to_thread(self._a.screenshot)
+        await self._call(self._a.act, payload)
+
+    async def screenshot(self) -> str:
+        # WindowsAgent.screenshot may hand back a dict, a URL string, or
+        # raw bytes depending on the server; normalize to a URL here so
+        # callers never dispatch on the payload type
+        result = await self._call(self._a.screenshot)
+        if isinstance(result, dict) and "url" in result:
+            return result["url"]
+        if isinstance(result, str):
+            return result
+        if isinstance(result, bytes):
+            return _store_screenshot(result)
+        raise TypeError(f"Unexpected screenshot result format: {type(result)}")
 
 def get_agent(os_url: Optional[str]) -> _BaseAgent:
+    if os.getenv("USE_SIM_AGENT"):
+        return _SimAgent()
     try:
         from cuteagent import WindowsAgent  # soft import
-        logging.info("Using real WindowsAgent.")
+        _LOG.info("Using real WindowsAgent.")
         return _WindowsAgentAdapter(WindowsAgent(os_url=os_url))
     except Exception as e:
-        logging.warning(f"Falling back to SimAgent (cuteagent unavailable): {e}")
+        _LOG.warning("Falling back to SimAgent (cuteagent unavailable): %s", e)
         return _SimAgent()
 
-AGENT: _BaseAgent = get_agent(OS_URL)
+@functools.lru_cache(maxsize=1)
+def _agent() -> _BaseAgent:
+    """Construct the agent on first use, once per process.
+
+    Keeps the cuteagent import (and its transitive deps) off the module
+    import path entirely for callers that never run an action, e.g. tests
+    importing the graph topology.
+    """
+    return get_agent(OS_URL)
 
 # =============================================================================
 # ACTION HELPERS
 # =============================================================================
 
-async def click_action(state: State, config: RunnableConfig, x: int, y: int, description: str, node_number: int) -> State:
+async def click_action(state: State, config: RunnableConfig, x: int, y: int, description: str, node_number: int) -> Dict[str, Any]:
     """Generic click action function."""
     try:
-        await AGENT.click(x, y)
-        logging.info(f"Node {node_number}: Successfully clicked at ({x}, {y}) - {description}")
-        state.status = "Success"
+        await _agent().click(x, y)
+        _LOG.info("Node %d: Successfully clicked at (%d, %d) - %s", node_number, x, y, description)
+        return {"status": "Success", "current_node": node_number}
     except Exception as e:
-        logging.error(f"Node {node_number}: Error clicking at ({x}, {y}) - {description}: {e}")
-        state.status = "Error"
-        state.has_error = True
-    
-    state.current_node = node_number
-    return state
+        _LOG.error("Node %d: Error clicking at (%d, %d) - %s: %s", node_number, x, y, description, e)
+        return {"status": "Error", "has_error": True, "current_node": node_number}
 
-async def double_click_action(state: State, config: RunnableConfig, x: int, y: int, description: str, node_number: int) -> State:
+async def double_click_action(state: State, config: RunnableConfig, x: int, y: int, description: str, node_number: int) -> Dict[str, Any]:
     """Generic double-click action function."""
     try:
-        await AGENT.double_click(x, y)
-        logging.info(f"Node {node_number}: Successfully double-clicked at ({x}, {y}) - {description}")
-        state.status = "Success"
+        await _agent().double_click(x, y)
+        _LOG.info("Node %d: Successfully double-clicked at (%d, %d) - %s", node_number, x, y, description)
+        return {"status": "Success", "current_node": node_number}
     except Exception as e:
-        logging.error(f"Node {node_number}: Error double-clicking at ({x}, {y}) - {description}: {e}")
-        state.status = "Error"
-        state.has_error = True
-    
-    state.current_node = node_number
-    return state
-
-async def input_action(state: State, config: RunnableConfig, text: str, description: str, node_number: int) -> State:
-    """Generic input action function."""
+        _LOG.error("Node %d: Error double-clicking at (%d, %d) - %s: %s", node_number, x, y, description, e)
+        return {"status": "Error", "has_error": True, "current_node": node_number}
+
+def _text_source(text: str):
+    """Resolve an input spec to a ``state -> str`` callable, once.
+
+    ``state.<field>`` references and plain literals are told apart here at
+    module load, so input_action carries no per-call prefix check.
+    """
+    if text.startswith("state."):
+        field_name = text[6:]  # Remove "state."
+        return lambda state: str(state.get(field_name, ""))
+    return lambda state: text
+
+async def input_action(state: State, config: RunnableConfig, get_text, description: str, node_number: int) -> Dict[str, Any]:
+    """Generic input action function; takes a resolver from _text_source."""
     try:
-        # Handle state field references
-        if text.startswith("state."):
-            field_name = text[6:]  # Remove "state."
-            text = str(getattr(state, field_name, ""))
-        
-        await AGENT.input_text(text)
-        logging.info(f"Node {node_number}: Successfully input text '{text}' - {description}")
-        state.status = "Success"
+        text = get_text(state)
+        await _agent().input_text(text)
+        _LOG.info("Node %d: Successfully input text %r - %s", node_number, text, description)
+        return {"status": "Success", "current_node": node_number}
     except Exception as e:
-        logging.error(f"Node {node_number}: Error inputting text - {description}: {e}")
-        state.status = "Error"
-        state.has_error = True
-    
-    state.current_node = node_number
-    return state
+        _LOG.error("Node %d: Error inputting text - %s: %s", node_number, description, e)
+        return {"status": "Error", "has_error": True, "current_node": node_number}
 
-async def enter_action(state: State, config: RunnableConfig, description: str, node_number: int) -> State:
+async def enter_action(state: State, config: RunnableConfig, description: str, node_number: int) -> Dict[str, Any]:
     """Generic enter key action function."""
     try:
-        await AGENT.press_enter()
-        logging.info(f"Node {node_number}: Successfully pressed ENTER - {description}")
-        state.status = "Success"
+        await _agent().press_enter()
+        _LOG.info("Node %d: Successfully pressed ENTER - %s", node_number, description)
+        return {"status": "Success", "current_node": node_number}
     except Exception as e:
-        logging.error(f"Node {node_number}: Error pressing ENTER - {description}: {e}")
-        state.status = "Error"
-        state.has_error = True
-    
-    state.current_node = node_number
-    return state
+        _LOG.error("Node %d: Error pressing ENTER - %s: %s", node_number, description, e)
+        return {"status": "Error", "has_error": True, "current_node": node_number}
 
-async def wait_action(state: State, config: RunnableConfig, duration: int, description: str, node_number: int) -> State:
+async def wait_action(state: State, config: RunnableConfig, duration: int, description: str, node_number: int) -> Dict[str, Any]:
     """Generic wait action function."""
     try:
         await asyncio.sleep(duration)
-        logging.info(f"Node {node_number}: Successfully waited {duration} seconds - {description}")
-        state.status = "Success"
+        _LOG.info("Node %d: Successfully waited %d seconds - %s", node_number, duration, description)
+        return {"status": "Success", "current_node": node_number}
     except Exception as e:
-        logging.error(f"Node {node_number}: Error during wait - {description}: {e}")
-        state.status = "Error"
-        state.has_error = True
-    
-    state.current_node = node_number
-    return state
+        _LOG.error("Node %d: Error during wait - %s: %s", node_number, description, e)
+        return {"status": "Error", "has_error": True, "current_node": node_number}
+
+# Raw screenshot bytes stay out of State: a megabyte data URI would be
+# copied into every checkpoint serialization, so bytes are spilled to a
+# local blob dir and only the URL travels with the state
+_BLOB_DIR = os.path.join(tempfile.gettempdir(), "encompass_screenshots")
 
-async def screenshot_action(state: State, config: RunnableConfig, description: str, node_number: int) -> State:
-    """Generic screenshot action function."""
+def _store_screenshot(data: bytes) -> str:
+    """Write screenshot bytes to the blob dir and return a file:// URL.
+
+    Falls back to an inline data URI if the write fails, so callers
+    always get a usable URL string.
+    """
+    try:
+        os.makedirs(_BLOB_DIR, exist_ok=True)
+        path = os.path.join(_BLOB_DIR, uuid.uuid4().hex + ".png")
+        with open(path, "wb") as f:
+            f.write(data)
+        return "file://" + path
+    except OSError as e:
+        _LOG.warning("Screenshot spill to %s failed (%s); inlining data URI", _BLOB_DIR, e)
+        return "data:image/png;base64," + _b64encode(data).decode('ascii')
+
+async def screenshot_action(state: State, config: RunnableConfig, description: str, node_number: int) -> Dict[str, Any]:
+    """Generic screenshot action function; agents always return a URL string."""
     try:
-        screenshot_result = await AGENT.screenshot()
-        
-        if isinstance(screenshot_result, dict) and "url" in screenshot_result:
-            state.screenshot_url = screenshot_result["url"]
-        elif isinstance(screenshot_result, str):
-            state.screenshot_url = screenshot_result
-        elif isinstance(screenshot_result, bytes):
-            base64_str = base64.b64encode(screenshot_result).decode('utf-8')
-            state.screenshot_url = f"data:image/png;base64,{base64_str}"
-        else:
-            logging.warning(f"Node {node_number}: Unexpected screenshot result format: {type(screenshot_result)}")
-            state.screenshot_url = None
-        
-        logging.info(f"Node {node_number}: Screenshot captured - {description}")
-        state.status = "Success"
+        url = await _agent().screenshot()
+        _LOG.info("Node %d: Screenshot captured - %s", node_number, description)
+        return {"screenshot_url": url, "status": "Success", "current_node": node_number}
     except Exception as e:
-        logging.error(f"Node {node_number}: Error taking screenshot - {description}: {e}")
-        state.status = "Error"
-        state.has_error = True
-        state.screenshot_url = None
-    
-    state.current_node = node_number
-    return state
+        _LOG.error("Node %d: Error taking screenshot - %s: %s", node_number, description, e)
+        return {"screenshot_url": None, "status": "Error", "has_error": True, "current_node": node_number}
+
+async def parallel(*coros):
+    """Await independent step coroutines concurrently.
+
+    Codegen emits this for groups whose steps touch disjoint state keys and
+    do not depend on each other's screen effects — e.g. a screenshot upload
+    or read-only probe overlapped with the next click's network dispatch.
+    Order-dependent UI actions must never share a group: this workflow's
+    chains are all strictly ordered clicks, so no groups are emitted here,
+    but the primitive is part of the generated-module contract.
+    """
+    return await asyncio.gather(*coros)
 
 # =============================================================================
 # WORKFLOW NODES
 # =============================================================================
 
-# Navigation phase nodes
-async def click_85_60(state: State, config: RunnableConfig) -> State:
-    """Initial click at (85, 60)"""
-    return await click_action(state, config, 85, 60, "Initial click", 1)
-
-async def click_233_234(state: State, config: RunnableConfig) -> State:
-    """Click at (233, 234)"""
-    return await click_action(state, config, 233, 234, "Click at text field", 2)
-
-async def type_default_loan(state: State, config: RunnableConfig) -> State:
+# Click steps as data: (step_name, x, y, description, node_number)
+NAV_CLICKS = (
+    ("click_85_60", 85, 60, "Initial click", 1),
+    ("click_233_234", 233, 234, "Click at text field", 2),
+)
+
+MAIN_STEPS = (
+    ("click_184_254_first", 184, 254, "First click at 184,254", 5),
+    ("click_184_254_second", 184, 254, "Second click at 184,254", 6),
+    ("click_340_36", 340, 36, "Click at 340,36", 7),
+    ("click_391_65", 391, 65, "Click at 391,65", 8),
+    ("click_507_266", 507, 266, "Click at 507,266", 9),
+    ("click_846_545", 846, 545, "Click at 846,545", 10),
+    ("click_859_669", 859, 669, "Click at 859,669", 11),
+    ("click_134_65", 134, 65, "Click at 134,65", 12),
+    ("click_28_438", 28, 438, "Click at 28,438", 13),
+    ("click_77_540", 77, 540, "Click at 77,540", 14),
+    ("click_1350_541", 1350, 541, "Click at 1350,541", 15),
+    ("click_878_313", 878, 313, "Click at 878,313", 16),
+    ("click_825_598", 825, 598, "Click at 825,598", 17),
+    ("click_765_447", 765, 447, "Click at 765,447", 18),
+    ("click_1339_97", 1339, 97, "Click at 1339,97", 19),
+    ("click_743_443", 743, 443, "Click at 743,443", 20),
+    ("click_81_60", 81, 60, "Click at 81,60", 21),
+    ("click_327_99", 327, 99, "Click at 327,99", 22),
+    ("click_216_117", 216, 117, "Click at 216,117", 23),
+    ("click_23_65", 23, 65, "Click at 23,65", 24),
+)
+
+RETURN_STEPS = (
+    ("click_1284_11", 1284, 11, "Click at 1284,11", 25),
+    ("click_124_633_first", 124, 633, "First click at 124,633", 26),
+    ("click_124_633_second", 124, 633, "Second click at 124,633", 27),
+    ("click_723_470", 723, 470, "Final click at 723,470", 28),
+)
+
+def _soa(steps):
+    """Split step tuples into parallel arrays (struct-of-arrays).
+
+    The run loop then walks packed machine ints and a flat description
+    tuple instead of unpacking a Python tuple per step; the step name is
+    only documentation and stays out of the hot data. The readable
+    tuple-of-tuples tables above remain the source of truth.
+    """
+    return (
+        array.array('i', (s[1] for s in steps)),
+        array.array('i', (s[2] for s in steps)),
+        tuple(s[3] for s in steps),
+        array.array('i', (s[4] for s in steps)),
+    )
+
+NAV_SOA = _soa(NAV_CLICKS)
+MAIN_SOA = _soa(MAIN_STEPS)
+RETURN_SOA = _soa(RETURN_STEPS)
+
+# Resolved once at module load; input_action never re-parses the spec
+_DEFAULT_LOAN_TEXT = _text_source("DEFAULT_LOAN")
+
+async def type_default_loan(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Type DEFAULT_LOAN text"""
     # Reconstruct the typed text from key press events
-    typed_text = "DEFAULT_LOAN"
-    state.typed_text = typed_text
-    return await input_action(state, config, typed_text, "Type DEFAULT_LOAN", 3)
+    update = await input_action(state, config, _DEFAULT_LOAN_TEXT, "Type DEFAULT_LOAN", 3)
+    update["typed_text"] = _DEFAULT_LOAN_TEXT(state)
+    return update
 
-async def press_enter_key(state: State, config: RunnableConfig) -> State:
+async def press_enter_key(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Press Enter key"""
     return await enter_action(state, config, "Press Enter", 4)
 
-# Main workflow nodes
-async def click_184_254_first(state: State, config: RunnableConfig) -> State:
-    """First click at (184, 254)"""
-    return await click_action(state, config, 184, 254, "First click at 184,254", 5)
-
-async def click_184_254_second(state: State, config: RunnableConfig) -> State:
-    """Second click at (184, 254)"""
-    return await click_action(state, config, 184, 254, "Second click at 184,254", 6)
-
-async def click_340_36(state: State, config: RunnableConfig) -> State:
-    """Click at (340, 36)"""
-    return await click_action(state, config, 340, 36, "Click at 340,36", 7)
-
-async def click_391_65(state: State, config: RunnableConfig) -> State:
-    """Click at (391, 65)"""
-    return await click_action(state, config, 391, 65, "Click at 391,65", 8)
-
-async def click_507_266(state: State, config: RunnableConfig) -> State:
-    """Click at (507, 266)"""
-    return await click_action(state, config, 507, 266, "Click at 507,266", 9)
-
-async def click_846_545(state: State, config: RunnableConfig) -> State:
-    """Click at (846, 545)"""
-    return await click_action(state, config, 846, 545, "Click at 846,545", 10)
-
-async def click_859_669(state: State, config: RunnableConfig) -> State:
-    """Click at (859, 669)"""
-    return await click_action(state, config, 859, 669, "Click at 859,669", 11)
-
-async def click_134_65(state: State, config: RunnableConfig) -> State:
-    """Click at (134, 65)"""
-    return await click_action(state, config, 134, 65, "Click at 134,65", 12)
-
-async def click_28_438(state: State, config: RunnableConfig) -> State:
-    """Click at (28, 438)"""
-    return await click_action(state, config, 28, 438, "Click at 28,438", 13)
-
-async def click_77_540(state: State, config: RunnableConfig) -> State:
-    """Click at (77, 540)"""
-    return await click_action(state, config, 77, 540, "Click at 77,540", 14)
-
-async def click_1350_541(state: State, config: RunnableConfig) -> State:
-    """Click at (1350, 541)"""
-    return await click_action(state, config, 1350, 541, "Click at 1350,541", 15)
-
-async def click_878_313(state: State, config: RunnableConfig) -> State:
-    """Click at (878, 313)"""
-    return await click_action(state, config, 878, 313, "Click at 878,313", 16)
-
-async def click_825_598(state: State, config: RunnableConfig) -> State:
-    """Click at (825, 598)"""
-    return await click_action(state, config, 825, 598, "Click at 825,598", 17)
-
-async def click_765_447(state: State, config: RunnableConfig) -> State:
-    """Click at (765, 447)"""
-    return await click_action(state, config, 765, 447, "Click at 765,447", 18)
-
-async def click_1339_97(state: State, config: RunnableConfig) -> State:
-    """Click at (1339, 97)"""
-    return await click_action(state, config, 1339, 97, "Click at 1339,97", 19)
-
-async def click_743_443(state: State, config: RunnableConfig) -> State:
-    """Click at (743, 443)"""
-    return await click_action(state, config, 743, 443, "Click at 743,443", 20)
-
-async def click_81_60(state: State, config: RunnableConfig) -> State:
-    """Click at (81, 60)"""
-    return await click_action(state, config, 81, 60, "Click at 81,60", 21)
-
-async def click_327_99(state: State, config: RunnableConfig) -> State:
-    """Click at (327, 99)"""
-    return await click_action(state, config, 327, 99, "Click at 327,99", 22)
-
-async def click_216_117(state: State, config: RunnableConfig) -> State:
-    """Click at (216, 117)"""
-    return await click_action(state, config, 216, 117, "Click at 216,117", 23)
-
-async def click_23_65(state: State, config: RunnableConfig) -> State:
-    """Click at (23, 65)"""
-    return await click_action(state, config, 23, 65, "Click at 23,65", 24)
-
-# Return phase nodes
-async def click_1284_11(state: State, config: RunnableConfig) -> State:
-    """Click at (1284, 11)"""
-    return await click_action(state, config, 1284, 11, "Click at 1284,11", 25)
-
-async def click_124_633_first(state: State, config: RunnableConfig) -> State:
-    """First click at (124, 633)"""
-    return await click_action(state, config, 124, 633, "First click at 124,633", 26)
-
-async def click_124_633_second(state: State, config: RunnableConfig) -> State:
-    """Second click at (124, 633)"""
-    return await click_action(state, config, 124, 633, "Second click at 124,633", 27)
-
-async def click_723_470(state: State, config: RunnableConfig) -> State:
-    """Final click at (723, 470)"""
-    return await click_action(state, config, 723, 470, "Final click at 723,470", 28)
-
 # =============================================================================
 # SUBGRAPH BUILDERS
 # =============================================================================
 
-def build_navigation_subgraph():
-    """Build navigation subgraph for initial steps."""
-    g = StateGraph(State)
-    g.add_node("click_85_60", click_85_60)
-    g.add_node("click_233_234", click_233_234)
-    g.add_node("type_default_loan", type_default_loan)
-    g.add_node("press_enter_key", press_enter_key)
-    
-    g.add_edge("__start__", "click_85_60")
-    g.add_edge("click_85_60", "click_233_234")
-    g.add_edge("click_233_234", "type_default_loan")
-    g.add_edge("type_default_loan", "press_enter_key")
-    g.add_edge("press_enter_key", "__end__")
-    
-    return g.compile(name="navigation_subgraph")
-
-def build_main_workflow():
-    """Build main workflow subgraph for core task steps."""
-    g = StateGraph(State)
-    g.add_node("click_184_254_first", click_184_254_first)
-    g.add_node("click_184_254_second", click_184_254_second)
-    g.add_node("click_340_36", click_340_36)
-    g.add_node("click_391_65", click_391_65)
-    g.add_node("click_507_266", click_507_266)
-    g.add_node("click_846_545", click_846_545)
-    g.add_node("click_859_669", click_859_669)
-    g.add_node("click_134_65", click_134_65)
-    g.add_node("click_28_438", click_28_438)
-    g.add_node("click_77_540", click_77_540)
-    g.add_node("click_1350_541", click_1350_541)
-    g.add_node("click_878_313", click_878_313)
-    g.add_node("click_825_598", click_825_598)
-    g.add_node("click_765_447", click_765_447)
-    g.add_node("click_1339_97", click_1339_97)
-    g.add_node("click_743_443", click_743_443)
-    g.add_node("click_81_60", click_81_60)
-    g.add_node("click_327_99", click_327_99)
-    g.add_node("click_216_117", click_216_117)
-    g.add_node("click_23_65", click_23_65)
-    
-    g.add_edge("__start__", "click_184_254_first")
-    g.add_edge("click_184_254_first", "click_184_254_second")
-    g.add_edge("click_184_254_second", "click_340_36")
-    g.add_edge("click_340_36", "click_391_65")
-    g.add_edge("click_391_65", "click_507_266")
-    g.add_edge("click_507_266", "click_846_545")
-    g.add_edge("click_846_545", "click_859_669")
-    g.add_edge("click_859_669", "click_134_65")
-    g.add_edge("click_134_65", "click_28_438")
-    g.add_edge("click_28_438", "click_77_540")
-    g.add_edge("click_77_540", "click_1350_541")
-    g.add_edge("click_1350_541", "click_878_313")
-    g.add_edge("click_878_313", "click_825_598")
-    g.add_edge("click_825_598", "click_765_447")
-    g.add_edge("click_765_447", "click_1339_97")
-    g.add_edge("click_1339_97", "click_743_443")
-    g.add_edge("click_743_443", "click_81_60")
-    g.add_edge("click_81_60", "click_327_99")
-    g.add_edge("click_327_99", "click_216_117")
-    g.add_edge("click_216_117", "click_23_65")
-    g.add_edge("click_23_65", "__end__")
-    
-    return g.compile(name="main_workflow")
-
-def build_return_subgraph():
-    """Build return subgraph for cleanup steps."""
-    g = StateGraph(State)
-    g.add_node("click_1284_11", click_1284_11)
-    g.add_node("click_124_633_first", click_124_633_first)
-    g.add_node("click_124_633_second", click_124_633_second)
-    g.add_node("click_723_470", click_723_470)
-    
-    g.add_edge("__start__", "click_1284_11")
-    g.add_edge("click_1284_11", "click_124_633_first")
-    g.add_edge("click_124_633_first", "click_124_633_second")
-    g.add_edge("click_124_633_second", "click_723_470")
-    g.add_edge("click_723_470", "__end__")
-    
-    return g.compile(name="return_subgraph")
+# Every edge in the three phases is unconditional, so each phase runs as one
+# node awaiting its steps in a plain loop: one Pregel superstep (channel
+# write + checkpoint + scheduler dispatch) per phase instead of one per click.
+# Unlike the node-per-step version, a phase stops at its first error.
+# Phase nodes return only the keys they changed, so LangGraph's reducer
+# merges a handful of fields instead of re-applying the whole State.
+
+async def _run_clicks(state: State, config: RunnableConfig, soa) -> Dict[str, Any]:
+    """Run a chain of click records, accumulating one partial update."""
+    xs, ys, descs, ns = soa
+    update: Dict[str, Any] = {}
+    for i in range(len(xs)):
+        update.update(await click_action(state, config, xs[i], ys[i], descs[i], ns[i]))
+        if update.get("has_error"):
+            break
+    return update
+
+async def run_navigation(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Navigation phase as one fused node: clicks, typing, enter."""
+    if state.get("has_error"):
+        return {}
+    update = await _run_clicks(state, config, NAV_SOA)
+    if not update.get("has_error"):
+        update.update(await type_default_loan({**state, **update}, config))
+    if not update.get("has_error"):
+        update.update(await press_enter_key({**state, **update}, config))
+    return update
+
+async def run_main(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Main workflow phase as one fused node."""
+    if state.get("has_error"):
+        return {}
+    return await _run_clicks(state, config, MAIN_SOA)
+
+async def run_return(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Return/cleanup phase as one fused node."""
+    if state.get("has_error"):
+        return {}
+    return await _run_clicks(state, config, RETURN_SOA)
 
 # =============================================================================
 # FINALIZER
 # =============================================================================
 
-async def finalize_state(state: State, config: RunnableConfig) -> State:
+async def finalize_state(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Finalize the workflow state."""
-    state.status = "Error" if state.has_error else "Completed"
-    return state
+    return {"status": "Error" if state.get("has_error") else "Completed"}
 
 # =============================================================================
 # MAIN GRAPH
 # =============================================================================
 
+@functools.cache
 def build_main_graph():
-    """Build the main graph with subgraphs."""
-    navigation_subgraph = build_navigation_subgraph()
-    main_workflow = build_main_workflow()
-    return_subgraph = build_return_subgraph()
-    
+    """Build the main graph: one node per phase plus the finalizer.
+
+    Cached so the compile (LangGraph walks and validates every node and
+    edge) runs once per process no matter how many times callers ask for
+    the graph. Compiled Pregel objects hold closures and locks, so an
+    on-disk pickle cache is not an option; in-process memoization plus the
+    lazy ``graph`` attribute below keeps repeat imports cheap instead.
+    """
     g = StateGraph(State)
-    g.add_node("navigation_subgraph", navigation_subgraph)
-    g.add_node("main_workflow", main_workflow)
-    g.add_node("return_subgraph", return_subgraph)
+    g.add_node("navigation_subgraph", run_navigation)
+    g.add_node("main_workflow", run_main)
+    g.add_node("return_subgraph", run_return)
     g.add_node("finalize_state", finalize_state)
-    
+
     g.add_edge("__start__", "navigation_subgraph")
     g.add_edge("navigation_subgraph", "main_workflow")
     g.add_edge("main_workflow", "return_subgraph")
     g.add_edge("return_subgraph", "finalize_state")
     g.add_edge("finalize_state", "__end__")
-    
+
     return g.compile(name=GRAPH_NAME)
 
-graph = build_main_graph()
\ No newline at end of file
+async def run_batch(inputs, max_concurrency: int = 8):
+    """Run the workflow once per input with bounded concurrency.
+
+    Throughput over N loans comes from overlapping per-run network waits;
+    the semaphore caps in-flight runs at what the OS_URL server can take.
+    Results are returned in input order.
+    """
+    graph = build_main_graph()
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(user_input):
+        async with sem:
+            return await graph.ainvoke({"user_input": user_input})
+
+    return await asyncio.gather(*(_one(i) for i in inputs))
+
+def __getattr__(name):
+    # PEP 562: `graph` stays part of the module contract but is only
+    # compiled when something actually reads it, not at import.
+    if name == "graph":
+        return build_main_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -5,6 +5,7 @@ Creates a blank template for Windows automation workflows.
 
 from __future__ import annotations
 
+import functools
 import json
 from typing import Union, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
@@ -33,6 +34,16 @@ class State(BaseModel):
 # OS URL - update this to point to your Windows server
 OS_URL = "https://fintor-ec2-dev.ngrok.app"
 
+@functools.lru_cache(maxsize=1)
+def get_agent(os_url: str = OS_URL) -> WindowsAgent:
+    """One shared WindowsAgent for the whole workflow.
+
+    Constructing the client per action throws away its HTTP session each
+    time; caching it amortizes connection setup across all steps and keeps
+    import cheap (nothing is created until the first action runs).
+    """
+    return WindowsAgent(os_url=os_url)
+
 # =============================================================================
 # ACTION FUNCTIONS
 # These are reusable building blocks for creating your workflow nodes
@@ -40,7 +51,7 @@ OS_URL = "https://fintor-ec2-dev.ngrok.app"
 
 async def click_action(x: int, y: int, description: str, node_number: int, state: State) -> State:
     """Generic click action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         await asyncio.to_thread(agent.click_element, x, y)
         logging.info(f"Node {node_number}: Successfully clicked at ({x}, {y}) - {description}")
@@ -69,7 +80,7 @@ async def wait_action(duration: int, description: str, node_number: int, state:
 
 async def input_action(text: str, description: str, node_number: int, state: State) -> State:
     """Generic input action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         # For INPUT action, use the correct format
         input_type = {
@@ -91,7 +102,7 @@ async def input_action(text: str, description: str, node_number: int, state: Sta
 
 async def enter_action(description: str, node_number: int, state: State) -> State:
     """Generic enter key action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         # For ENTER action, use the act method with ENTER action
         input_data = {
@@ -113,7 +124,7 @@ async def enter_action(description: str, node_number: int, state: State) -> Stat
 
 async def double_click_action(x: int, y: int, description: str, node_number: int, state: State) -> State:
     """Generic double-click action function."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     try:
         # Use the correct DOUBLE-CLICK action format
         input_type = {
@@ -135,7 +146,7 @@ async def double_click_action(x: int, y: int, description: str, node_number: int
 
 async def screenshot_action(description: str, node_number: int, state: State) -> Tuple[State, Optional[str]]:
     """Generic screenshot action function. Returns (state, screenshot_url)."""
-    agent = WindowsAgent(os_url=OS_URL)
+    agent = get_agent()
     screenshot_url = None
     
     try: